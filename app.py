@@ -10,7 +10,7 @@ from utils.data_loader import DataLoader
 from utils.process_analyzer import ProcessAnalyzer
 from utils.visualizer import ProcessVisualizer
 from utils.ai_analyzer import AIAnalyzer
-from utils.exporter import ResultExporter
+from utils.exporter import ResultExporter, PYARROW_AVAILABLE
 from utils.csv_diagnostics import CSVDiagnostics
 
 st.set_page_config(
@@ -1122,6 +1122,8 @@ def show_visualizations():
             # Mostrar imagen
             if 'image_path' in viz_data:
                 st.image(viz_data['image_path'], caption=f"Visualización: {viz_type}")
+            elif 'image_bytes' in viz_data:
+                st.image(viz_data['image_bytes'], caption=f"Visualización: {viz_type}")
             
             # Mostrar métricas si están disponibles
             if 'metrics' in viz_data:
@@ -1387,6 +1389,12 @@ def show_export_results():
         
         include_visualizations = st.checkbox("Incluir visualizaciones", value=True)
         include_raw_data = st.checkbox("Incluir datos originales", value=False)
+        prefer_parquet_for_raw = False
+        if include_raw_data and export_format == "CSV":
+            if PYARROW_AVAILABLE:
+                prefer_parquet_for_raw = st.checkbox("Datos originales en formato Parquet", value=False)
+            else:
+                st.info("Exportación a Parquet no disponible: instale pyarrow (los datos originales se exportarán en CSV)")
     
     if st.button("Generar Exportación", type="primary"):
         try:
@@ -1421,6 +1429,7 @@ def show_export_results():
                 
                 if include_raw_data and st.session_state.mapped_data is not None:
                     export_data['raw_data'] = st.session_state.mapped_data.to_dict()
+                    export_data['prefer_parquet_for_raw'] = prefer_parquet_for_raw
                 
                 # Crear archivo
                 file_data = None
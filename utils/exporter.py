@@ -1,4 +1,5 @@
 import json
+import re
 import pandas as pd
 import io
 import base64
@@ -7,6 +8,20 @@ from fpdf import FPDF
 import tempfile
 import os
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Colores 'transparent' de los SVG de Graphviz (fpdf2 solo entiende 'none')
+SVG_TRANSPARENT = re.compile(r'\b(fill|stroke)="transparent"')
+
+# Listas de las secciones de IA que se resumen en los reportes
+AI_LIST_KEYS = ('insights', 'recommendations', 'optimizations', 'improvements')
+TOP_ITEMS = 5
+
 class ResultExporter:
     """Clase para exportar resultados de análisis en diferentes formatos"""
     
@@ -33,7 +48,7 @@ class ResultExporter:
             pdf.ln(5)
             
             # Resultados
-            results = export_data.get('results', {})
+            results = self._normalize_results(export_data.get('results', {}))
             
             for section_name, section_data in results.items():
                 if section_name.startswith('ai_'):
@@ -76,7 +91,7 @@ class ResultExporter:
                 summary_df.to_excel(writer, sheet_name='Resumen', index=False)
                 
                 # Hojas de análisis
-                results = export_data.get('results', {})
+                results = self._normalize_results(export_data.get('results', {}))
                 
                 for section_name, section_data in results.items():
                     sheet_name = self._clean_sheet_name(section_name)
@@ -96,7 +111,7 @@ class ResultExporter:
                 
                 # Datos originales si están incluidos
                 if export_data.get('raw_data'):
-                    raw_df = pd.DataFrame(export_data['raw_data'])
+                    raw_df = self._raw_data_frame(export_data)
                     raw_df.to_excel(writer, sheet_name='Datos_Originales', index=False)
             
             output.seek(0)
@@ -120,7 +135,7 @@ class ResultExporter:
                 zip_file.writestr('metadata.csv', metadata_csv)
                 
                 # Resultados de análisis
-                results = export_data.get('results', {})
+                results = self._normalize_results(export_data.get('results', {}))
                 
                 for section_name, section_data in results.items():
                     filename = f"{section_name}.csv"
@@ -140,11 +155,12 @@ class ResultExporter:
                     elif section_name.startswith('ai_'):
                         # Análisis de IA
                         ai_data = []
-                        if 'insights' in section_data:
-                            for insight in section_data['insights']:
+                        # Mismas listas recortadas que el PDF y el Excel
+                        if 'insights_top' in section_data:
+                            for insight in section_data['insights_top']:
                                 ai_data.append({'Type': 'Insight', 'Content': insight})
-                        if 'recommendations' in section_data:
-                            for rec in section_data['recommendations']:
+                        if 'recommendations_top' in section_data:
+                            for rec in section_data['recommendations_top']:
                                 ai_data.append({'Type': 'Recommendation', 'Content': rec})
                         
                         if ai_data:
@@ -154,9 +170,15 @@ class ResultExporter:
                 
                 # Datos originales si están incluidos
                 if export_data.get('raw_data'):
-                    raw_df = pd.DataFrame(export_data['raw_data'])
-                    raw_csv = raw_df.to_csv(index=False)
-                    zip_file.writestr('datos_originales.csv', raw_csv)
+                    if export_data.get('prefer_parquet_for_raw') and PYARROW_AVAILABLE:
+                        # Parquet es columnar y comprimido: mucho más rápido que CSV para event logs
+                        zip_file.writestr('datos_originales.parquet', self.export_to_parquet(export_data))
+                    else:
+                        if export_data.get('prefer_parquet_for_raw'):
+                            print("Advertencia: pyarrow no está instalado, los datos originales se exportan en CSV")
+                        raw_df = self._raw_data_frame(export_data)
+                        raw_csv = raw_df.to_csv(index=False)
+                        zip_file.writestr('datos_originales.csv', raw_csv)
             
             zip_buffer.seek(0)
             return zip_buffer.getvalue()
@@ -164,6 +186,25 @@ class ResultExporter:
         except Exception as e:
             raise Exception(f"Error al exportar CSV: {str(e)}")
     
+    def export_to_parquet(self, export_data):
+        """Exportar datos originales a Parquet (requiere pyarrow)"""
+        try:
+            if not PYARROW_AVAILABLE:
+                raise ImportError("pyarrow no está instalado")
+            
+            if not export_data.get('raw_data'):
+                raise ValueError("No hay datos originales para exportar")
+            
+            raw_df = self._raw_data_frame(export_data)
+            table = pa.Table.from_pandas(raw_df, preserve_index=False)
+            
+            output = io.BytesIO()
+            pq.write_table(table, output, compression='zstd', compression_level=3)
+            return output.getvalue()
+            
+        except Exception as e:
+            raise Exception(f"Error al exportar Parquet: {str(e)}")
+    
     def export_to_json(self, export_data):
         """Exportar resultados a JSON"""
         try:
@@ -191,25 +232,25 @@ class ResultExporter:
         
         if 'insights' in section_data:
             pdf.cell(0, 6, "Insights principales:", 0, 1)
-            for insight in section_data['insights'][:5]:  # Limitar a 5
+            for insight in section_data['insights_top']:
                 pdf.multi_cell(0, 6, f"- {insight}")
             pdf.ln(3)
         
         if 'recommendations' in section_data:
             pdf.cell(0, 6, "Recomendaciones:", 0, 1)
-            for rec in section_data['recommendations'][:5]:  # Limitar a 5
+            for rec in section_data['recommendations_top']:
                 pdf.multi_cell(0, 6, f"- {rec}")
             pdf.ln(3)
         
         if 'optimizations' in section_data:
             pdf.cell(0, 6, "Optimizaciones:", 0, 1)
-            for opt in section_data['optimizations'][:5]:  # Limitar a 5
+            for opt in section_data['optimizations_top']:
                 pdf.multi_cell(0, 6, f"- {opt}")
             pdf.ln(3)
         
         if 'improvements' in section_data:
             pdf.cell(0, 6, "Mejoras sugeridas:", 0, 1)
-            for imp in section_data['improvements'][:5]:  # Limitar a 5
+            for imp in section_data['improvements_top']:
                 pdf.multi_cell(0, 6, f"- {imp}")
         
         pdf.ln(5)
@@ -229,11 +270,14 @@ class ResultExporter:
             if os.path.exists(image_path):
                 try:
                     # Agregar imagen al PDF
-                    pdf.image(image_path, x=10, w=180)
+                    pdf.image(self._pdf_image_source(image_path), x=10, w=180)
                     pdf.ln(10)
                 except Exception as e:
                     pdf.cell(0, 6, f"Error cargando imagen: {str(e)}", 0, 1)
                     pdf.ln(3)
+            else:
+                pdf.cell(0, 6, "Imagen no disponible: vuelva a generar la visualizacion antes de exportar", 0, 1)
+                pdf.ln(3)
         
         if 'metrics' in section_data:
             pdf.cell(0, 6, "Metricas del modelo:", 0, 1)
@@ -241,6 +285,16 @@ class ResultExporter:
                 pdf.cell(0, 6, f"- {metric}: {value}", 0, 1)
             pdf.ln(5)
     
+    def _pdf_image_source(self, image_path):
+        """Preparar una imagen para fpdf2: los SVG de Graphviz usan el color 'transparent', que fpdf2 no admite"""
+        if not image_path.lower().endswith('.svg'):
+            return image_path
+        
+        with open(image_path, 'r', encoding='utf-8') as f:
+            svg = f.read()
+        svg = SVG_TRANSPARENT.sub(r'\1="none"', svg)
+        return io.BytesIO(svg.encode('utf-8'))
+    
     def _add_analysis_section_to_pdf(self, pdf, section_name, section_data):
         """Agregar sección de análisis general al PDF"""
         pdf.set_font('Arial', 'B', 12)
@@ -413,18 +467,46 @@ class ResultExporter:
         """Exportar análisis de IA a Excel"""
         ai_data = []
         
-        if 'insights' in data:
-            for insight in data['insights']:
+        # Mismas listas recortadas que el PDF y el CSV
+        if 'insights_top' in data:
+            for insight in data['insights_top']:
                 ai_data.append({'Tipo': 'Insight', 'Contenido': insight})
         
-        if 'recommendations' in data:
-            for rec in data['recommendations']:
+        if 'recommendations_top' in data:
+            for rec in data['recommendations_top']:
                 ai_data.append({'Tipo': 'Recomendación', 'Contenido': rec})
         
         if ai_data:
             ai_df = pd.DataFrame(ai_data)
             ai_df.to_excel(writer, sheet_name=sheet_name, index=False)
     
+    def _normalize_results(self, results):
+        """Preparar una vista de los resultados compartida por todos los formatos"""
+        normalized = {}
+        for section_name, section_data in results.items():
+            if section_name.startswith('ai_') and isinstance(section_data, dict):
+                view = dict(section_data)
+                for key in AI_LIST_KEYS:
+                    if key in view:
+                        view[f"{key}_top"] = view[key][:TOP_ITEMS]
+                normalized[section_name] = view
+            else:
+                normalized[section_name] = section_data
+        
+        return normalized
+    
+    def _raw_data_frame(self, export_data):
+        """Construir DataFrame de datos originales con columnas numéricas reducidas"""
+        raw_df = pd.DataFrame(export_data['raw_data'])
+        
+        # int64/float64 por defecto duplica los bytes escritos; reducir al tipo mínimo
+        for col in raw_df.select_dtypes(include='integer').columns:
+            raw_df[col] = pd.to_numeric(raw_df[col], downcast='integer')
+        for col in raw_df.select_dtypes(include='float').columns:
+            raw_df[col] = pd.to_numeric(raw_df[col], downcast='float')
+        
+        return raw_df
+    
     def _clean_sheet_name(self, name):
         """Limpiar nombre de hoja para Excel"""
         # Excel no permite ciertos caracteres en nombres de hojas
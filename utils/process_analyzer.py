@@ -1,3 +1,5 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
 import pm4py
 import pandas as pd
 from datetime import datetime, timedelta
@@ -7,71 +9,145 @@ class ProcessAnalyzer:
     """Clase para realizar análisis de process mining usando pm4py"""
     
     def __init__(self):
-        pass
+        self._df_cache = {}
+        self._variants_cache = {}
+        self._variant_stats_cache = {}
+    
+    def _as_df(self, event_log):
+        """Obtener el event log como DataFrame (convertido una sola vez por log)"""
+        cached = self._df_cache.get(id(event_log))
+        if cached is not None and cached[0] is event_log:
+            return cached[1]
+        
+        if isinstance(event_log, pd.DataFrame):
+            df = event_log.copy()
+        else:
+            df = pm4py.convert_to_dataframe(event_log)
+        
+        # Columnas de texto como categoría: groupby y conteos operan sobre códigos enteros
+        for column in ('concept:name', 'case:concept:name', 'org:resource', 'lifecycle:transition'):
+            if column in df.columns:
+                df[column] = df[column].astype('category')
+        # Timestamps como arreglo datetime64 contiguo (no objetos Timestamp por evento)
+        df['time:timestamp'] = pd.to_datetime(df['time:timestamp'])
+        
+        # Guardar también el log para que su id no se reutilice mientras esté en caché
+        self._df_cache[id(event_log)] = (event_log, df)
+        return df
+    
+    def _has_column_data(self, df, column):
+        """Verificar si el log tiene al menos un valor en la columna"""
+        if column not in df.columns:
+            return False
+        
+        # Muestra rápida: el primer evento suele bastar para confirmar que hay datos
+        values = df[column]
+        if len(values) > 0 and pd.notna(values.iat[0]):
+            return True
+        
+        return bool(values.notna().any())
+    
+    def _get_variants(self, event_log):
+        """Obtener variantes del log (calculadas una sola vez por log)"""
+        cached = self._variants_cache.get(id(event_log))
+        if cached is not None and cached[0] is event_log:
+            return cached[1]
+        
+        variants = pm4py.get_variants(event_log)
+        self._variants_cache[id(event_log)] = (event_log, variants)
+        return variants
+    
+    def _variant_stats(self, event_log):
+        """Frecuencias de variantes compartidas por los análisis (calculadas una sola vez por log)"""
+        cached = self._variant_stats_cache.get(id(event_log))
+        if cached is not None and cached[0] is event_log:
+            return cached[1]
+        
+        variants = self._get_variants(event_log)
+        total_cases = sum(len(traces) if isinstance(traces, list) else traces for traces in variants.values())
+        variant_freq = self._build_variant_freq(variants, total_cases, 'Cases')
+        
+        variant_stats = {
+            'variant_freq': variant_freq,
+            'top_variants': heapq.nlargest(10, variant_freq, key=lambda x: x['Cases'])
+        }
+        self._variant_stats_cache[id(event_log)] = (event_log, variant_stats)
+        return variant_stats
+    
+    def _build_variant_freq(self, variants, total_cases, key_name):
+        """Construir lista de frecuencias de variantes"""
+        variant_freq = []
+        
+        for variant, traces in variants.items():
+            variant_str = ' -> '.join(variant)
+            # traces puede ser una lista o un número, manejar ambos casos
+            count = len(traces) if isinstance(traces, list) else traces
+            variant_freq.append({
+                'Variant': variant_str,
+                key_name: count,
+                'Percentage': (count / total_cases) * 100 if total_cases > 0 else 0
+            })
+        
+        return variant_freq
+    
+    def _case_durations(self, df):
+        """Duración de cada caso en días, en el orden de aparición de los casos"""
+        grouped = df.groupby('case:concept:name', observed=True, sort=False)
+        timestamps = grouped['time:timestamp']
+        case_counts = timestamps.count()
+        counts = case_counts.to_numpy()
+        # Restar como enteros de nanosegundos en lugar de Timedelta.total_seconds()
+        first = timestamps.min().to_numpy(dtype='datetime64[ns]').view('i8')
+        last = timestamps.max().to_numpy(dtype='datetime64[ns]').view('i8')
+        durations = (last - first) / (24 * 3600 * 1e9)
+        
+        # Si solo hay un evento, usar duración de actividad si está disponible
+        if 'activity:duration' in df.columns:
+            single_event = grouped['activity:duration'].first().to_numpy(dtype=float) / (24 * 3600)
+            single_event[np.isnan(single_event)] = 0.001
+        else:
+            single_event = np.full(len(durations), 0.001)
+        
+        durations = np.where(counts > 1, durations, single_event)
+        np.maximum(durations, 0.001, out=durations)  # Evitar duraciones de 0
+        
+        return pd.Series(durations, index=case_counts.index)[counts > 0]
     
     def analyze_process(self, event_log):
         """Análisis general del proceso"""
         try:
             results = {}
             
+            df = self._as_df(event_log)
+            
             # Estadísticas básicas
-            results['num_cases'] = len(event_log)
-            results['num_events'] = sum(len(trace) for trace in event_log)
+            results['num_cases'] = df['case:concept:name'].nunique()
+            results['num_events'] = len(df)
             
             # Obtener actividades únicas
-            activities = set()
-            for trace in event_log:
-                for event in trace:
-                    activities.add(event['concept:name'])
-            results['num_activities'] = len(activities)
+            results['num_activities'] = df['concept:name'].nunique()
             
             # Duración de casos
-            case_durations = []
-            
-            for trace in event_log:
-                if len(trace) > 0:
-                    timestamps = [event['time:timestamp'] for event in trace if 'time:timestamp' in event]
-                    if timestamps:
-                        if len(timestamps) > 1:
-                            duration = (max(timestamps) - min(timestamps)).total_seconds() / (24 * 3600)  # días
-                            case_durations.append(max(duration, 0.001))
-                        else:
-                            # Si solo hay un evento, buscar duración de actividad
-                            for event in trace:
-                                if 'activity:duration' in event and pd.notna(event['activity:duration']):
-                                    duration = float(event['activity:duration']) / (24 * 3600)
-                                    case_durations.append(max(duration, 0.001))
-                                    break
-                            else:
-                                case_durations.append(0.001)  # duración mínima por defecto
-            
-            if case_durations:
+            case_durations = self._case_durations(df).to_numpy()
+            
+            if len(case_durations):
                 results['avg_case_duration'] = np.mean(case_durations)
                 results['min_case_duration'] = np.min(case_durations)
                 results['max_case_duration'] = np.max(case_durations)
-                results['case_durations'] = case_durations
+                results['case_durations'] = case_durations.tolist()
             else:
                 results['avg_case_duration'] = 0
                 results['min_case_duration'] = 0
                 results['max_case_duration'] = 0
                 results['case_durations'] = []
             
-            # Frecuencia de actividades
-            activity_counts = {}
-            for trace in event_log:
-                for event in trace:
-                    activity = event['concept:name']
-                    activity_counts[activity] = activity_counts.get(activity, 0) + 1
-            
-            activity_freq = [
-                {'Activity': activity, 'Frequency': count} 
+            # Frecuencia de actividades (Top 10)
+            activity_counts = df['concept:name'].value_counts().head(10)
+            results['activity_frequency'] = [
+                {'Activity': activity, 'Frequency': int(count)}
                 for activity, count in activity_counts.items()
             ]
             
-            # Ordenar por frecuencia
-            activity_freq.sort(key=lambda x: x['Frequency'], reverse=True)
-            results['activity_frequency'] = activity_freq[:10]  # Top 10
-            
             # Tiempo entre actividades
             results['avg_activity_duration'] = self._calculate_avg_activity_duration(event_log)
             
@@ -80,23 +156,11 @@ class ProcessAnalyzer:
             
             # Agregar análisis básico de variantes para visión preliminar
             try:
-                variants = pm4py.get_variants(event_log)
-                variant_freq = []
-                total_cases = len(event_log)
-                
-                for variant, traces in variants.items():
-                    variant_str = ' -> '.join(variant)
-                    # traces puede ser una lista o un número, manejar ambos casos
-                    count = len(traces) if isinstance(traces, list) else traces
-                    variant_freq.append({
-                        'Variant': variant_str,
-                        'Count': count,
-                        'Percentage': (count / total_cases) * 100 if total_cases > 0 else 0
-                    })
-                
-                # Ordenar por número de casos
-                variant_freq.sort(key=lambda x: x['Count'], reverse=True)
-                results['variant_stats'] = variant_freq[:10]  # Top 10 para visión preliminar
+                top_variants = self._variant_stats(event_log)['top_variants']
+                results['variant_stats'] = [  # Top 10 para visión preliminar
+                    {'Variant': v['Variant'], 'Count': v['Cases'], 'Percentage': v['Percentage']}
+                    for v in top_variants
+                ]
                 
             except Exception as e:
                 print(f"Error obteniendo variantes básicas: {str(e)}")
@@ -107,36 +171,38 @@ class ProcessAnalyzer:
         except Exception as e:
             raise Exception(f"Error en análisis de proceso: {str(e)}")
     
+    def analyze_all(self, event_log, sla_target_days=None):
+        """Ejecutar todos los análisis del proceso en paralelo"""
+        # Preparar DataFrame y variantes antes de lanzar los hilos: los análisis solo leen las cachés
+        self._as_df(event_log)
+        self._variant_stats(event_log)
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {
+                'process': executor.submit(self.analyze_process, event_log),
+                'variants': executor.submit(self.analyze_variants, event_log),
+                'costs': executor.submit(self.analyze_costs, event_log),
+                'resources': executor.submit(self.analyze_resources, event_log),
+                'performance': executor.submit(self.analyze_performance, event_log, sla_target_days)
+            }
+            return {name: future.result() for name, future in futures.items()}
+    
     def analyze_variants(self, event_log):
         """Análisis de variantes del proceso"""
         try:
             results = {}
             
             # Obtener variantes
-            variants = pm4py.get_variants(event_log)
-            results['num_variants'] = len(variants)
+            variant_stats = self._variant_stats(event_log)
+            variant_freq = variant_stats['variant_freq']
+            results['num_variants'] = len(variant_freq)
             
             # Top variantes por frecuencia
-            variant_freq = []
-            total_cases = len(event_log)
-            
-            for variant, traces in variants.items():
-                variant_str = ' -> '.join(variant)
-                # traces puede ser una lista o un número, manejar ambos casos
-                count = len(traces) if isinstance(traces, list) else traces
-                variant_freq.append({
-                    'Variant': variant_str,
-                    'Cases': count,
-                    'Percentage': (count / total_cases) * 100 if total_cases > 0 else 0
-                })
-            
-            # Ordenar por número de casos
-            variant_freq.sort(key=lambda x: x['Cases'], reverse=True)
-            results['top_variants'] = variant_freq[:10]
+            results['top_variants'] = variant_stats['top_variants']
             
             # Análisis de conformidad (casos que siguen el flujo más común)
             if variant_freq:
-                most_common_variant = variant_freq[0]
+                most_common_variant = results['top_variants'][0]
                 results['conformance'] = [{
                     'Most_Common_Variant': most_common_variant['Variant'],
                     'Cases_Following': most_common_variant['Cases'],
@@ -159,55 +225,41 @@ class ProcessAnalyzer:
             results = {}
             
             # Verificar si hay datos de costo
-            has_cost_data = any(
-                'cost:total' in event for trace in event_log for event in trace
-            )
+            df = self._as_df(event_log)
+            has_cost_data = self._has_column_data(df, 'cost:total')
             
             if not has_cost_data:
                 return None
             
             # Calcular costos totales
-            total_cost = 0
-            costs_by_activity = {}
-            costs_by_case = {}
+            costs = pd.to_numeric(df['cost:total'], errors='coerce')
+            cost_events = df.assign(cost=costs).dropna(subset=['cost'])
             
-            for trace in event_log:
-                case_id = trace.attributes['concept:name']
-                case_cost = 0
-                
-                for event in trace:
-                    if 'cost:total' in event and pd.notna(event['cost:total']):
-                        cost = float(event['cost:total'])
-                        activity = event['concept:name']
-                        
-                        total_cost += cost
-                        case_cost += cost
-                        
-                        if activity not in costs_by_activity:
-                            costs_by_activity[activity] = 0
-                        costs_by_activity[activity] += cost
-                
-                if case_cost > 0:
-                    costs_by_case[case_id] = case_cost
+            total_cost = cost_events['cost'].sum()
+            costs_by_activity = cost_events.groupby('concept:name', observed=True, sort=False)['cost'].sum()
+            costs_by_case = cost_events.groupby('case:concept:name', observed=True, sort=False)['cost'].sum()
+            costs_by_case = costs_by_case[costs_by_case > 0]
             
             results['total_cost'] = total_cost
-            results['avg_cost_per_case'] = total_cost / len(costs_by_case) if costs_by_case else 0
-            results['avg_cost_per_activity'] = total_cost / len(costs_by_activity) if costs_by_activity else 0
+            results['avg_cost_per_case'] = total_cost / len(costs_by_case) if len(costs_by_case) else 0
+            results['avg_cost_per_activity'] = total_cost / len(costs_by_activity) if len(costs_by_activity) else 0
             
             # Costos por actividad
-            cost_by_activity = [
-                {'Activity': activity, 'Total_Cost': cost, 'Avg_Cost': cost / sum(1 for trace in event_log for event in trace if event['concept:name'] == activity)}
-                for activity, cost in costs_by_activity.items()
-            ]
-            cost_by_activity.sort(key=lambda x: x['Total_Cost'], reverse=True)
-            results['cost_by_activity'] = cost_by_activity
+            activity_event_counts = df['concept:name'].value_counts()
+            cost_by_activity = pd.DataFrame({
+                'Activity': costs_by_activity.index.astype(object),
+                'Total_Cost': costs_by_activity.to_numpy(),
+                'Avg_Cost': costs_by_activity.to_numpy() / activity_event_counts.reindex(costs_by_activity.index).to_numpy()
+            })
+            # Se devuelven todas las actividades: la vista de costos y la exportación las muestran completas
+            cost_by_activity = cost_by_activity.sort_values('Total_Cost', ascending=False, kind='stable')
+            results['cost_by_activity'] = cost_by_activity.to_dict('records')
             
             # Costos por caso
-            case_costs = list(costs_by_case.values())
-            if case_costs:
-                results['min_case_cost'] = min(case_costs)
-                results['max_case_cost'] = max(case_costs)
-                results['median_case_cost'] = np.median(case_costs)
+            if len(costs_by_case):
+                results['min_case_cost'] = costs_by_case.min()
+                results['max_case_cost'] = costs_by_case.max()
+                results['median_case_cost'] = costs_by_case.median()
             
             return results
             
@@ -220,50 +272,25 @@ class ProcessAnalyzer:
             results = {}
             
             # Verificar si hay datos de recursos
-            has_resource_data = any(
-                'org:resource' in event for trace in event_log for event in trace
-            )
+            df = self._as_df(event_log)
+            has_resource_data = self._has_column_data(df, 'org:resource')
             
             if not has_resource_data:
                 return None
             
-            # Obtener recursos únicos
-            resources = set()
-            resource_activities = {}
-            resource_cases = {}
-            
-            for trace in event_log:
-                case_id = trace.attributes['concept:name']
-                
-                for event in trace:
-                    if 'org:resource' in event and pd.notna(event['org:resource']):
-                        resource = str(event['org:resource'])
-                        activity = event['concept:name']
-                        
-                        resources.add(resource)
-                        
-                        if resource not in resource_activities:
-                            resource_activities[resource] = set()
-                            resource_cases[resource] = set()
-                        
-                        resource_activities[resource].add(activity)
-                        resource_cases[resource].add(case_id)
-            
-            results['num_resources'] = len(resources)
+            resource_events = df.dropna(subset=['org:resource'])
+            resource_names = resource_events['org:resource'].astype(str)
             
             # Carga de trabajo por recurso
-            resource_workload = []
-            for resource in resources:
-                activities_count = len(resource_activities.get(resource, set()))
-                cases_count = len(resource_cases.get(resource, set()))
-                
-                resource_workload.append({
-                    'Resource': resource,
-                    'Activities': activities_count,
-                    'Cases': cases_count
-                })
+            workload = resource_events.groupby(resource_names.rename('Resource'), sort=False).agg(
+                Activities=('concept:name', 'nunique'),
+                Cases=('case:concept:name', 'nunique')
+            ).reset_index()
             
-            resource_workload.sort(key=lambda x: x['Activities'], reverse=True)
+            results['num_resources'] = len(workload)
+            
+            workload = workload.sort_values('Activities', ascending=False, kind='stable')
+            resource_workload = workload.to_dict('records')
             results['resource_workload'] = resource_workload
             
             # Promedio de actividades por recurso
@@ -271,17 +298,12 @@ class ProcessAnalyzer:
                 avg_activities = sum(r['Activities'] for r in resource_workload) / len(resource_workload)
                 results['avg_activities_per_resource'] = avg_activities
             
-            # Matriz recurso-actividad
-            all_activities = set(event['concept:name'] for trace in event_log for event in trace)
-            matrix_data = []
-            
-            for resource in list(resources)[:10]:  # Limitar a top 10 recursos
-                row = {'Resource': resource}
-                for activity in list(all_activities)[:10]:  # Limitar a top 10 actividades
-                    count = sum(1 for trace in event_log for event in trace 
-                              if event.get('org:resource') == resource and event['concept:name'] == activity)
-                    row[activity] = count
-                matrix_data.append(row)
+            # Matriz recurso-actividad (top 10 recursos x top 10 actividades)
+            matrix = pd.crosstab(resource_names, resource_events['concept:name'])
+            top_resources = resource_names.value_counts().head(10).index
+            top_activities = df['concept:name'].value_counts().head(10).index
+            matrix = matrix.reindex(index=top_resources, columns=top_activities, fill_value=0)
+            matrix_data = matrix.rename_axis(index='Resource', columns=None).reset_index().to_dict('records')
             
             results['resource_activity_matrix'] = matrix_data
             
@@ -296,86 +318,41 @@ class ProcessAnalyzer:
             results = {}
             
             # Obtener duraciones por caso y variante
-            case_durations = {}
-            variant_durations = {}
-            case_variants = {}
+            df = self._as_df(event_log)
+            durations = self._case_durations(df)
             
-            # Obtener variantes
-            variants = pm4py.get_variants(event_log)
+            # Determinar la variante de cada caso (solo actividades únicas, en orden de aparición)
+            first_occurrences = df.drop_duplicates(['case:concept:name', 'concept:name'])
+            case_variant_keys = first_occurrences.groupby('case:concept:name', observed=True, sort=False)['concept:name'].apply(tuple)
+            case_variant_keys = case_variant_keys.reindex(durations.index)
             
-            for trace in event_log:
-                case_id = trace.attributes.get('concept:name', 'Unknown')
-                
-                if len(trace) > 0:
-                    try:
-                        timestamps = []
-                        activities = []
-                        
-                        for event in trace:
-                            if 'time:timestamp' in event:
-                                timestamps.append(event['time:timestamp'])
-                            if 'concept:name' in event:
-                                activities.append(event['concept:name'])
-                        
-                        if timestamps:
-                            # Calcular duración del caso completo usando el rango de timestamps
-                            calculated_duration = 0.001  # valor por defecto
-                            
-                            if len(timestamps) > 1:
-                                calculated_duration = (max(timestamps) - min(timestamps)).total_seconds() / (24 * 3600)  # días
-                                calculated_duration = max(calculated_duration, 0.001)  # Evitar duraciones de 0
-                            else:
-                                # Si solo hay un evento, usar duración de actividad si está disponible
-                                for event in trace:
-                                    if 'activity:duration' in event and pd.notna(event['activity:duration']):
-                                        calculated_duration = float(event['activity:duration']) / (24 * 3600)  # convertir a días
-                                        calculated_duration = max(calculated_duration, 0.001)
-                                        break
-                            
-                            case_durations[case_id] = calculated_duration
-                            
-                            # Determinar la variante de este caso (solo actividades únicas)
-                            unique_activities = []
-                            seen = set()
-                            for activity in activities:
-                                if activity not in seen:
-                                    unique_activities.append(activity)
-                                    seen.add(activity)
-                            
-                            case_activities = tuple(unique_activities)
-                            case_variants[case_id] = case_activities
-                            
-                            if case_activities not in variant_durations:
-                                variant_durations[case_activities] = []
-                            variant_durations[case_activities].append(calculated_duration)
-                            
-                    except Exception as e:
-                        print(f"Error procesando caso {case_id}: {str(e)}")
-                        continue
+            # Duraciones como arreglo alineado con los ids de caso (sin diccionarios intermedios)
+            case_ids = durations.index
+            case_durations = durations.to_numpy()
+            
+            # Estadísticas de duración por variante en un solo groupby
+            variant_ids, variant_keys = pd.factorize(case_variant_keys.to_numpy())
+            grouped = pd.Series(case_durations, index=variant_ids).groupby(level=0)
+            variant_stats = grouped.agg(['mean', 'min', 'max', 'count'])
+            variant_stats['std'] = grouped.std(ddof=0)
             
             # Validar que tenemos datos válidos
-            if not case_durations:
+            if len(case_durations) == 0:
                 raise Exception("No se pudieron calcular duraciones válidas de los casos")
             
             # Calcular duración promedio del proceso
-            valid_durations = [d for d in case_durations.values() if d > 0 and not np.isnan(d)]
-            if not valid_durations:
+            valid_durations = case_durations[(case_durations > 0) & ~np.isnan(case_durations)]
+            if len(valid_durations) == 0:
                 raise Exception("No se encontraron duraciones válidas para analizar")
                 
             avg_process_duration = np.mean(valid_durations)
             
             # Encontrar variante ideal (menor duración promedio)
-            variant_avg_durations = {}
-            for variant, durations in variant_durations.items():
-                valid_variant_durations = [d for d in durations if d > 0 and not np.isnan(d)]
-                if valid_variant_durations:
-                    variant_avg_durations[variant] = np.mean(valid_variant_durations)
-            
-            if not variant_avg_durations:
+            if variant_stats.empty:
                 raise Exception("No se encontraron variantes válidas para analizar")
                 
-            ideal_variant = min(variant_avg_durations.items(), key=lambda x: x[1])
-            ideal_duration = ideal_variant[1]
+            ideal_id = variant_stats['mean'].idxmin()
+            ideal_duration = variant_stats.at[ideal_id, 'mean']
             
             # Calcular desempeño por duración (variante ideal / promedio proceso)
             duration_performance_ratio = (ideal_duration / avg_process_duration) if avg_process_duration > 0 else 0
@@ -385,51 +362,35 @@ class ProcessAnalyzer:
                 'avg_process_duration': avg_process_duration,
                 'performance_ratio': duration_performance_ratio,
                 'performance_percentage': duration_performance_ratio * 100,
-                'ideal_variant': ' -> '.join(ideal_variant[0]) if ideal_variant else 'N/A'
+                'ideal_variant': ' -> '.join(variant_keys[ideal_id])
             }
             
             # Análisis de costos si están disponibles
-            has_cost_data = any('cost:total' in event for trace in event_log for event in trace)
+            has_cost_data = self._has_column_data(df, 'cost:total')
             
             if has_cost_data:
-                case_costs = {}
-                variant_costs = {}
+                # Costo por caso sumando solo costos positivos
+                costs = pd.to_numeric(df['cost:total'], errors='coerce')
+                positive = costs > 0
+                case_costs = costs[positive].groupby(df.loc[positive, 'case:concept:name'], observed=True, sort=False).sum()
+                case_costs = case_costs[case_costs > 0]
                 
-                for trace in event_log:
-                    case_id = trace.attributes.get('concept:name', 'Unknown')
-                    case_cost = 0
-                    
-                    try:
-                        for event in trace:
-                            if 'cost:total' in event and pd.notna(event['cost:total']):
-                                try:
-                                    cost_value = float(event['cost:total'])
-                                    if cost_value > 0:
-                                        case_cost += cost_value
-                                except (ValueError, TypeError):
-                                    continue
-                        
-                        if case_cost > 0:
-                            case_costs[case_id] = case_cost
-                            variant = case_variants.get(case_id)
-                            if variant:
-                                if variant not in variant_costs:
-                                    variant_costs[variant] = []
-                                variant_costs[variant].append(case_cost)
-                                
-                    except Exception as e:
-                        print(f"Error procesando costos para caso {case_id}: {str(e)}")
-                        continue
-                
-                avg_process_cost = np.mean(list(case_costs.values())) if case_costs else 0
+                avg_process_cost = case_costs.mean() if len(case_costs) else 0
                 
                 # Encontrar variante ideal por costo
-                variant_avg_costs = {}
-                for variant, costs in variant_costs.items():
-                    variant_avg_costs[variant] = np.mean(costs)
+                case_variant_ids = pd.Series(variant_ids, index=case_ids).reindex(case_costs.index)
+                has_variant = case_variant_ids.notna().to_numpy()
+                variant_avg_costs = case_costs[has_variant].groupby(
+                    case_variant_ids[has_variant].astype(int).to_numpy(), sort=False
+                ).mean()
                 
-                ideal_cost_variant = min(variant_avg_costs.items(), key=lambda x: x[1]) if variant_avg_costs else None
-                ideal_cost = ideal_cost_variant[1] if ideal_cost_variant else 0
+                if len(variant_avg_costs):
+                    ideal_cost_id = variant_avg_costs.idxmin()
+                    ideal_cost = variant_avg_costs[ideal_cost_id]
+                    ideal_cost_variant = ' -> '.join(variant_keys[ideal_cost_id])
+                else:
+                    ideal_cost = 0
+                    ideal_cost_variant = 'N/A'
                 
                 # Calcular desempeño por costo (costo variante ideal / costo promedio proceso)
                 cost_performance_ratio = (ideal_cost / avg_process_cost) if avg_process_cost > 0 else 0
@@ -439,14 +400,14 @@ class ProcessAnalyzer:
                     'avg_process_cost': avg_process_cost,
                     'performance_ratio': cost_performance_ratio,
                     'performance_percentage': cost_performance_ratio * 100,
-                    'ideal_cost_variant': ' -> '.join(ideal_cost_variant[0]) if ideal_cost_variant else 'N/A'
+                    'ideal_cost_variant': ideal_cost_variant
                 }
             else:
                 results['cost_performance'] = None
             
             # Análisis de SLA si se proporciona target
             if sla_target_days:
-                cases_within_sla = sum(1 for duration in case_durations.values() if duration <= sla_target_days)
+                cases_within_sla = int(np.count_nonzero(case_durations <= sla_target_days))
                 total_cases = len(case_durations)
                 sla_compliance = (cases_within_sla / total_cases) * 100 if total_cases > 0 else 0
                 
@@ -460,21 +421,18 @@ class ProcessAnalyzer:
             else:
                 results['sla_performance'] = None
             
-            # Comparación de duración por variante
-            variant_comparison = []
-            for variant, durations in variant_durations.items():
-                variant_str = ' -> '.join(variant)
-                variant_comparison.append({
-                    'Variante': variant_str,
-                    'Casos': len(durations),
-                    'Duración_Promedio': np.mean(durations),
-                    'Duración_Mínima': np.min(durations),
-                    'Duración_Máxima': np.max(durations),
-                    'Desviación_Estándar': np.std(durations)
-                })
-            
-            # Ordenar por duración promedio
-            variant_comparison.sort(key=lambda x: x['Duración_Promedio'])
+            # Comparación de duración por variante, ordenada por duración promedio
+            variant_comparison = [
+                {
+                    'Variante': ' -> '.join(variant_keys[variant_id]),
+                    'Casos': int(stats['count']),
+                    'Duración_Promedio': stats['mean'],
+                    'Duración_Mínima': stats['min'],
+                    'Duración_Máxima': stats['max'],
+                    'Desviación_Estándar': stats['std']
+                }
+                for variant_id, stats in variant_stats.sort_values('mean', kind='stable').iterrows()
+            ]
             results['variant_duration_comparison'] = variant_comparison
             
             return results
@@ -485,28 +443,23 @@ class ProcessAnalyzer:
     def _calculate_avg_activity_duration(self, event_log):
         """Calcular duración promedio de actividades"""
         try:
-            durations = []
+            df = self._as_df(event_log)
             
-            for trace in event_log:
-                events_by_activity = {}
-                
-                for event in trace:
-                    activity = event['concept:name']
-                    lifecycle = event.get('lifecycle:transition', 'complete')
-                    timestamp = event['time:timestamp']
-                    
-                    if activity not in events_by_activity:
-                        events_by_activity[activity] = {}
-                    
-                    events_by_activity[activity][lifecycle] = timestamp
-                
-                # Calcular duración para cada actividad
-                for activity, events in events_by_activity.items():
-                    if 'start' in events and 'complete' in events:
-                        duration = (events['complete'] - events['start']).total_seconds() / 3600  # horas
-                        durations.append(duration)
+            if 'lifecycle:transition' not in df.columns:
+                return 0
+            
+            # Emparejar último 'start' y último 'complete' de cada actividad en cada caso
+            lifecycle = df['lifecycle:transition']
+            is_start = lifecycle == 'start'
+            is_complete = (lifecycle == 'complete') | lifecycle.isna()
             
-            return np.mean(durations) if durations else 0
+            keys = ['case:concept:name', 'concept:name']
+            starts = df[is_start].groupby(keys, observed=True, sort=False)['time:timestamp'].last()
+            completes = df[is_complete].groupby(keys, observed=True, sort=False)['time:timestamp'].last()
+            paired = pd.concat([starts.rename('start'), completes.rename('complete')], axis=1, join='inner')
+            
+            durations = (paired['complete'] - paired['start']).dt.total_seconds() / 3600  # horas
+            return durations.mean() if len(durations) else 0
             
         except Exception as e:
             return 0
@@ -514,22 +467,16 @@ class ProcessAnalyzer:
     def _analyze_cases_by_period(self, event_log):
         """Analizar casos por período de tiempo"""
         try:
-            cases_by_date = {}
+            df = self._as_df(event_log)
             
-            for trace in event_log:
-                case_id = trace.attributes['concept:name']
-                timestamps = [event['time:timestamp'] for event in trace]
-                
-                if timestamps:
-                    case_start = min(timestamps).date()
-                    if case_start not in cases_by_date:
-                        cases_by_date[case_start] = 0
-                    cases_by_date[case_start] += 1
+            # Fecha de inicio de cada caso y número de casos por fecha
+            case_starts = df.groupby('case:concept:name', observed=True, sort=False)['time:timestamp'].min().dt.floor('D')
+            cases_by_date = case_starts.value_counts().sort_index()
             
             # Convertir a lista ordenada
             period_data = [
-                {'Date': date.isoformat(), 'Cases': count}
-                for date, count in sorted(cases_by_date.items())
+                {'Date': date.date().isoformat(), 'Cases': int(count)}
+                for date, count in cases_by_date.items()
             ]
             
             return period_data
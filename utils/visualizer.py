@@ -1,9 +1,25 @@
 import pm4py
+import pandas as pd
+from pm4py.visualization.petri_net import visualizer as pn_visualizer
+from pm4py.visualization.heuristics_net import visualizer as hn_visualizer
+from pm4py.visualization.bpmn import visualizer as bpmn_visualizer
+from pm4py.objects.process_tree.obj import Operator
 import tempfile
+import hashlib
+import re
+import io
+import heapq
 import os
 import subprocess
 import shutil
-from datetime import datetime
+import time
+import itertools
+import copy
+import functools
+import inspect
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
     import graphviz
@@ -11,49 +27,498 @@ try:
 except ImportError:
     GRAPHVIZ_AVAILABLE = False
 
+try:
+    import pygraphviz
+    PYGRAPHVIZ_AVAILABLE = True
+except ImportError:
+    PYGRAPHVIZ_AVAILABLE = False
+
+# Etiquetas de los operadores del process tree, por miembro de Operator (sin str() por nodo)
+# y por su representación textual
+_OP_LABELS = {
+    Operator.XOR: 'xor', Operator.PARALLEL: 'or', Operator.LOOP: 'xor loop', Operator.SEQUENCE: 'seq',
+    'X': 'xor', '×': 'xor', '+': 'or', '*': 'xor loop', '→': 'seq', '->': 'seq', 'SEQ': 'seq', '∧': 'and', 'AND': 'and'
+}
+
+# Resolución de los PNG destinados a exportación y, por defecto, a pantalla
+EXPORT_DPI = 300
+PREVIEW_DPI = 150
+
+# Antigüedad (segundos) a partir de la cual se eliminan las imágenes generadas: las rutas quedan
+# guardadas en la sesión para exportar, así que el margen debe cubrir una sesión de trabajo
+MAX_OUTPUT_AGE = 24 * 3600
+# Último barrido del directorio de salida (compartido: Streamlit crea una instancia por rerun)
+_last_reap = 0.0
+
+# Número de actividades a partir del cual el DFG se dispone con sfdp
+DFG_SFDP_THRESHOLD = 50
+# Máximo de arcos del DFG que se dibujan (los más frecuentes)
+DFG_MAX_EDGES = 200
+# Actividades a partir de las cuales la visualización alternativa usa layout circular
+ALT_CIRCULAR_THRESHOLD = 100
+
+# Número de casos a partir del cual fast_metrics omite la precisión
+FAST_METRICS_THRESHOLD = 5000
+# Proporción variantes/casos por debajo de la cual el fitness se calcula por variantes
+VARIANT_REPLAY_RATIO = 0.2
+# Fitness mínimo para calcular la precisión: con un modelo que no encaja carece de sentido
+PRECISION_MIN_FITNESS = 0.1
+# Valor de la precisión cuando no se calcula, con el motivo (se muestra tal cual en las métricas)
+PRECISION_SKIPPED_LARGE_LOG = "N/A (log grande)"
+PRECISION_SKIPPED_LOW_FITNESS = "N/A (fitness muy bajo)"
+
+# Resultados de create_* ya generados, compartidos entre instancias (Streamlit crea una por rerun),
+# por vista, contenido del log y opciones; válidos mientras su imagen siga en disco
+MAX_CACHED_OUTPUTS = 64
+_OUTPUT_CACHE = {}
+_OUTPUT_LOCK = threading.Lock()
+_OUTPUT_SIGNATURES = {}
+
+# Diccionario vacío compartido por los resultados sin datos; no debe modificarse
+_EMPTY = {}
+
+# Identificador de sesión (uno por proceso) y contador: nombres únicos sin consultar el reloj
+_SESSION_ID = uuid.uuid4().hex[:8]
+_STAMP_COUNTER = itertools.count()
+
+def _escape(text):
+    """Escapar un identificador para usarlo entre comillas en código DOT"""
+    return str(text).replace('\\', '\\\\').replace('"', '\\"')
+
+# Barras invertidas ante una comilla o al final: escaparían la comilla de cierre
+_LABEL_UNSAFE = re.compile(r'(\\*)("|\Z)')
+
+def _label(text):
+    """Escapar comillas de una etiqueta DOT (conservando secuencias como \\n)"""
+    return _LABEL_UNSAFE.sub(lambda m: m.group(1) * 2 + ('\\"' if m.group(2) else ''), str(text))
+
+def _dot_source(header, lines):
+    """Completar una cabecera DOT precalculada con las líneas de nodos y arcos"""
+    return header + "".join(f"\t{line}\n" for line in lines) + "}\n"
+
+# Cabeceras DOT con el estilo fijo de cada tipo de grafo
+_DFG_HEADER = (
+    'digraph DFG {\n'
+    '\tbgcolor=white size="12,8"\n'
+    '\toverlap=prism splines=true nodesep=0.3 ranksep=0.4\n'
+    '\tnode [fontcolor=black fontname=Arial fontsize=10]\n'
+    '\tedge [arrowhead=normal arrowsize=0.8 color=black]\n'
+    # Nodo de inicio (círculo verde) y de fin (círculo naranja)
+    '\tSTART [label="" fillcolor="#00FF00" fixedsize=true height=0.8 shape=circle style=filled width=0.8]\n'
+    '\tEND [label="" fillcolor="#FFA500" fixedsize=true height=0.8 shape=circle style=filled width=0.8]\n'
+)
+_TREE_HEADER = (
+    'digraph ProcessTree {\n'
+    '\trankdir=TB size="12,8" bgcolor=white\n'
+    # Fusionar aristas paralelas y fijar el orden de los hijos
+    '\tconcentrate=true ordering=out\n'
+    '\tnode [fontcolor=black fontname=Arial fontsize=11 shape=ellipse style=filled fillcolor=white margin="0.1,0.05"]\n'
+    '\tedge [arrowhead=normal arrowsize=0.8 color=black]\n'
+)
+_CUSTOM_HEADER = (
+    'digraph {\n'
+    '\trankdir=LR size="12,8"\n'
+    '\tnode [fillcolor=lightblue shape=rectangle style="rounded,filled"]\n'
+    '\tedge [color=gray fontsize=10]\n'
+)
+_SUMMARY_HEADER = (
+    'digraph Summary {\n'
+    '\trankdir=TB size="16,12"\n'
+    '\tnode [shape=rectangle style="rounded,filled"]\n'
+)
+
+def _copy_result(result):
+    """Copia de un resultado de create_* con métricas y datos propios (los modelos se comparten)"""
+    copied = dict(result)
+    for field in ('metrics', 'dfg_data'):
+        if field in copied:
+            copied[field] = copy.deepcopy(copied[field])
+    return copied
+
+def _cached_output(method):
+    """Devolver el resultado ya generado de un create_* si el log y las opciones coinciden"""
+    _OUTPUT_SIGNATURES[method.__name__] = inspect.signature(method)
+    
+    @functools.wraps(method)
+    def wrapper(self, event_log, *args, **kwargs):
+        key = self._output_key(method.__name__, event_log, args, kwargs)
+        cached = self._lookup_output(key)
+        if cached is not None:
+            return cached
+        
+        result = method(self, event_log, *args, **kwargs)
+        if key is not None and result.get('success') and result.get('image_path'):
+            # Guardar una copia: el llamador puede modificar el resultado que recibe
+            stored = _copy_result(result)
+            with _OUTPUT_LOCK:
+                if len(_OUTPUT_CACHE) >= MAX_CACHED_OUTPUTS:
+                    _OUTPUT_CACHE.pop(next(iter(_OUTPUT_CACHE)), None)
+                _OUTPUT_CACHE[key] = stored
+        return result
+    return wrapper
+
 def check_graphviz_executable():
     """Verificar si el ejecutable de Graphviz está disponible"""
     return shutil.which('dot') is not None
 
+def _discover_models(visualizer, model_key, event_log):
+    """Descubrir un modelo y calcular sus métricas en un proceso hijo"""
+    if model_key == 'heur':
+        models = {'heur': visualizer._get_heuristic_net(event_log)}
+        petri = models['heur'][1]
+    else:
+        models = {'tree': visualizer._get_process_tree(event_log),
+                  'petri_net': visualizer._get_petri_from_tree(event_log)}
+        petri = models['petri_net']
+    return models, visualizer._evaluate(event_log, *petri)
+
+class LazyImage:
+    """Imagen que se renderiza la primera vez que se consulta su image_path"""
+    __slots__ = ('_render', '_path')
+    
+    def __init__(self, render):
+        self._render = render
+        self._path = None
+    
+    @property
+    def image_path(self):
+        if self._path is None:
+            self._path = self._render()
+        return self._path
+    
+    def __fspath__(self):
+        return self.image_path
+
 class ProcessVisualizer:
     """Clase para crear visualizaciones de procesos usando pm4py y Graphviz"""
     
     def __init__(self):
-        self.temp_dir = tempfile.gettempdir()
+        # Directorio propio para las imágenes, en memoria (tmpfs) si está disponible
+        use_shm = os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK)
+        base_dir = '/dev/shm' if use_shm else tempfile.gettempdir()
+        self.temp_dir = os.path.join(base_dir, 'st-pm')
+        os.makedirs(self.temp_dir, exist_ok=True)
+        self._temp = self.temp_dir + os.sep
         self.graphviz_available = GRAPHVIZ_AVAILABLE and check_graphviz_executable()
+        # Modelos ya descubiertos, por huella del contenido del event log
+        self._log_cache = {}
+        self._fingerprints = {}
+        # Fitness y precisión por (huella del log, estructura de la red)
+        self._replay_cache = {}
+        # Un lock por modelo o replay: los hilos de render_all no repiten el mismo cálculo
+        self._locks = {}
+        # Pools de render_all (se crean bajo demanda): procesos para descubrimiento
+        # y replay, hilos para los renders (esperan al subproceso dot y al disco)
+        self._pool = None
+        self._io_pool = None
+        # Con batch_renders, _render_dot deja el DOT en _pending_dots hasta flush_renders()
+        self.batch_renders = False
+        self._pending_dots = []
+        # Replay por variante y sin precisión en logs grandes
+        self.fast_metrics = True
+        # Resolución de los PNG para pantalla (EXPORT_DPI con high_res=True)
+        self.dpi = PREVIEW_DPI
+        # Formato de las vistas de pm4py: SVG evita el rasterizado con Cairo (high_res=True sigue generando PNG)
+        self.output_format = 'svg'
+    
+    def __getstate__(self):
+        """Excluir pools y cachés al serializar: los procesos hijos reciben el event log como argumento"""
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_io_pool'] = None
+        # Las cachés contienen el event log y los modelos ya descubiertos: no enviarlos a cada tarea
+        state['_log_cache'] = {}
+        state['_replay_cache'] = {}
+        # Memoria por id(): no es válida en otro proceso; los locks no se serializan
+        state['_fingerprints'] = {}
+        state['_locks'] = {}
+        return state
+    
+    def _stamp(self):
+        """Sufijo único para los archivos generados"""
+        return f"{_SESSION_ID}_{next(_STAMP_COUNTER)}"
+    
+    def _output_path(self, filename):
+        """Ruta de salida dentro del directorio temporal, limpiando imágenes antiguas"""
+        self._reap_old()
+        return self._temp + filename
+    
+    def _reap_old(self):
+        """Eliminar imágenes generadas hace más de MAX_OUTPUT_AGE segundos que ya no estén en _OUTPUT_CACHE"""
+        global _last_reap
+        now = time.time()
+        # Como mucho un barrido por minuto
+        if now - _last_reap < 60:
+            return
+        _last_reap = now
+        
+        # Imágenes que este proceso aún puede devolver desde la caché de resultados
+        with _OUTPUT_LOCK:
+            referenced = {result.get('image_path') for result in _OUTPUT_CACHE.values()}
+        try:
+            with os.scandir(self.temp_dir) as entries:
+                for entry in entries:
+                    try:
+                        if (entry.is_file() and entry.path not in referenced
+                                and now - entry.stat().st_mtime > MAX_OUTPUT_AGE):
+                            os.remove(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+    
+    def _get_pool(self):
+        """Crear el pool de procesos con 'spawn' para convivir con Streamlit"""
+        if self._pool is None:
+            # Importados aquí: solo render_all usa procesos hijos
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            
+            self._pool = ProcessPoolExecutor(
+                max_workers=min(5, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._pool
+    
+    def _get_io_pool(self):
+        """Crear el pool de hilos para los renders"""
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=4)
+        return self._io_pool
+    
+    def _fingerprint(self, event_log):
+        """Huella del contenido del event log (casos, actividades y orden), calculada una vez por objeto"""
+        cached = self._fingerprints.get(id(event_log))
+        if cached is not None and cached[0] is event_log:
+            return cached[1]
+        
+        # Logs con el mismo contenido comparten huella aunque sean objetos distintos
+        digest = hashlib.blake2b(digest_size=16)
+        if isinstance(event_log, pd.DataFrame):
+            columns = [c for c in ('case:concept:name', 'concept:name', 'time:timestamp') if c in event_log.columns]
+            digest.update(pd.util.hash_pandas_object(event_log[columns], index=False).to_numpy().tobytes())
+        else:
+            for trace in event_log:
+                activities = [event.get('concept:name') for event in trace]
+                digest.update(repr((trace.attributes.get('concept:name'), activities)).encode('utf-8'))
+        
+        fingerprint = f"{len(event_log)}-{digest.hexdigest()}"
+        self._fingerprints[id(event_log)] = (event_log, fingerprint)
+        return fingerprint
+    
+    def _output_key(self, method_name, event_log, args=(), kwargs=_EMPTY):
+        """Clave de _OUTPUT_CACHE; None si el resultado no se reutiliza (render diferido o en memoria)"""
+        bound = _OUTPUT_SIGNATURES[method_name].bind(self, event_log, *args, **kwargs)
+        bound.apply_defaults()
+        options = {name: value for name, value in bound.arguments.items() if name not in ('self', 'event_log')}
+        if options.get('lazy') or options.get('return_bytes'):
+            return None
+        return (method_name, self._fingerprint(event_log), self.dpi, self.output_format, self.fast_metrics,
+                self.graphviz_available, tuple(sorted(options.items())))
+    
+    def _lookup_output(self, key):
+        """Copia del resultado guardado para la clave, si su imagen sigue en disco"""
+        if key is None:
+            return None
+        with _OUTPUT_LOCK:
+            cached = _OUTPUT_CACHE.get(key)
+        if cached is None or not os.path.exists(cached['image_path']):
+            return None
+        return _copy_result(cached)
+    
+    def _cache_entry(self, event_log):
+        """Obtener la entrada de caché asociada al event log"""
+        return self._log_cache.setdefault(self._fingerprint(event_log), {'event_log': event_log})
+    
+    def _lock(self, key):
+        """Lock asociado a una clave de caché (setdefault es atómico con el GIL)"""
+        return self._locks.setdefault(key, threading.RLock())
+    
+    def _get_process_tree(self, event_log):
+        """Descubrir el process tree con inductive miner (una sola vez por log)"""
+        entry = self._cache_entry(event_log)
+        if 'tree' not in entry:
+            with self._lock((self._fingerprint(event_log), 'inductive')):
+                if 'tree' not in entry:
+                    entry['tree'] = pm4py.discover_process_tree_inductive(event_log)
+        return entry['tree']
+    
+    def _get_petri_from_tree(self, event_log):
+        """Red de Petri equivalente al process tree inductivo (una sola vez por log)"""
+        entry = self._cache_entry(event_log)
+        if 'petri_net' not in entry:
+            with self._lock((self._fingerprint(event_log), 'inductive')):
+                if 'petri_net' not in entry:
+                    entry['petri_net'] = pm4py.convert_to_petri_net(self._get_process_tree(event_log))
+        return entry['petri_net']
+    
+    def _get_heuristic_net(self, event_log):
+        """Descubrir la red heurística y su Red de Petri (una sola vez por log)"""
+        entry = self._cache_entry(event_log)
+        if 'heur' not in entry:
+            with self._lock((self._fingerprint(event_log), 'heur')):
+                if 'heur' not in entry:
+                    heuristic_net = pm4py.discover_heuristics_net(event_log)
+                    entry['heur'] = (heuristic_net, pm4py.convert_to_petri_net(heuristic_net))
+        return entry['heur']
+    
+    def _net_key(self, petri_net, initial_marking, final_marking):
+        """Clave estructural de una Red de Petri: arcos, transiciones y marcados"""
+        return hash((
+            frozenset((arc.source.name, arc.target.name) for arc in petri_net.arcs),
+            frozenset((transition.name, transition.label) for transition in petri_net.transitions),
+            frozenset((place.name, tokens) for place, tokens in initial_marking.items()),
+            frozenset((place.name, tokens) for place, tokens in final_marking.items())
+        ))
+    
+    def _evaluate(self, event_log, petri_net, initial_marking, final_marking):
+        """Calcular fitness y precisión por token-based replay (una sola vez por log y red equivalente)"""
+        key = (self._fingerprint(event_log), self._net_key(petri_net, initial_marking, final_marking))
+        if key not in self._replay_cache:
+            with self._lock(key):
+                if key not in self._replay_cache:
+                    self._replay_cache[key] = self._replay(event_log, petri_net, initial_marking, final_marking)
+        return self._replay_cache[key]
+    
+    def _replay(self, event_log, petri_net, initial_marking, final_marking):
+        """Token-based replay del log sobre la red: (fitness, precisión)"""
+        try:
+            variants = pm4py.get_variants(event_log)
+            counts = [count if isinstance(count, int) else len(count) for count in variants.values()]
+            if self.fast_metrics or len(counts) < VARIANT_REPLAY_RATIO * sum(counts):
+                fitness = self._variant_fitness(variants, counts, petri_net, initial_marking, final_marking)
+            else:
+                fitness = pm4py.fitness_token_based_replay(event_log, petri_net, initial_marking, final_marking)['log_fitness']
+            
+            # La precisión requiere replay de prefijos sobre el log completo: omitir cuando el modelo
+            # apenas reproduce el log y en logs grandes
+            if fitness <= PRECISION_MIN_FITNESS:
+                precision = PRECISION_SKIPPED_LOW_FITNESS
+            elif self.fast_metrics and sum(counts) > FAST_METRICS_THRESHOLD:
+                precision = PRECISION_SKIPPED_LARGE_LOG
+            else:
+                precision = pm4py.precision_token_based_replay(event_log, petri_net, initial_marking, final_marking)
+        except:
+            fitness = 0.0
+            precision = 0.0
+        return fitness, precision
+    
+    def _variant_fitness(self, variants, counts, petri_net, initial_marking, final_marking):
+        """Fitness por replay de una traza por variante, ponderada por frecuencia"""
+        from pm4py.objects.log.obj import EventLog, Trace, Event
+        
+        variant_log = EventLog()
+        for variant in variants:
+            variant_log.append(Trace([Event({'concept:name': activity}) for activity in variant]))
+        
+        replayed = pm4py.conformance_diagnostics_token_based_replay(variant_log, petri_net, initial_marking, final_marking)
+        
+        # Misma fórmula que log_fitness de pm4py, con cada variante pesando su frecuencia
+        missing = consumed = remaining = produced = 0
+        for trace_result, count in zip(replayed, counts):
+            missing += count * trace_result['missing_tokens']
+            consumed += count * trace_result['consumed_tokens']
+            remaining += count * trace_result['remaining_tokens']
+            produced += count * trace_result['produced_tokens']
+        if consumed > 0 and produced > 0:
+            return 0.5 * (1 - missing / consumed) + 0.5 * (1 - remaining / produced)
+        return 0.0
+    
+    def _format_metric(self, value):
+        """Formatear una métrica; si no se calculó, el texto con el motivo (PRECISION_SKIPPED_*)"""
+        return value if isinstance(value, str) else f"{value:.3f}"
+    
+    def render_all(self, event_log, lazy=False):
+        """Generar todas las visualizaciones: modelos en procesos hijos, renders en hilos (diferidos con lazy=True)"""
+        views = {
+            'petri_net': 'create_petri_net',
+            'heuristic_net': 'create_heuristic_net',
+            'process_tree': 'create_process_tree',
+            'bpmn': 'create_bpmn',
+            'dfg': 'create_dfg'
+        }
+        
+        # Vistas ya generadas para este contenido del log: no se descubre ni se dibuja nada para ellas
+        results = {}
+        for view, method_name in views.items():
+            cached = self._lookup_output(self._output_key(method_name, event_log, kwargs={'lazy': lazy}))
+            if cached is not None:
+                results[view] = cached
+        missing = {view: method_name for view, method_name in views.items() if view not in results}
+        
+        # Descubrimiento y replay (CPU) en procesos hijos, una sola vez por modelo;
+        # los resultados se guardan en la caché del proceso padre
+        entry = self._cache_entry(event_log)
+        needed = {'heur' if view == 'heuristic_net' else 'inductive' for view in missing if view != 'dfg'}
+        pending = [model_key for model_key, field in (('inductive', 'petri_net'), ('heur', 'heur'))
+                   if model_key in needed and field not in entry]
+        if pending:
+            try:
+                pool = self._get_pool()
+                discovered = pool.map(_discover_models, [self] * len(pending), pending, [event_log] * len(pending))
+                for model_key, (models, replay) in zip(pending, discovered):
+                    entry.update(models)
+                    petri = models['heur'][1] if model_key == 'heur' else models['petri_net']
+                    self._replay_cache[(self._fingerprint(event_log), self._net_key(*petri))] = replay
+            except Exception:
+                pass  # Cada create_* descubrirá lo que falte y reportará su propio error
+        
+        # Renders en hilos: con la caché poblada, cada create_* solo dibuja y escribe.
+        # Los grafos propios se acumulan y se renderizan juntos en una sola invocación de dot
+        io_pool = self._get_io_pool()
+        self.batch_renders = not lazy
+        try:
+            futures = {io_pool.submit(getattr(self, method_name), event_log, lazy=lazy): view
+                       for view, method_name in missing.items()}
+            for future in as_completed(futures):
+                view = futures[future]
+                try:
+                    results[view] = future.result()
+                except Exception as e:
+                    results[view] = {'success': False, 'error': f"Error al generar {view}: {str(e)}"}
+        finally:
+            self.batch_renders = False
+        
+        pending_outputs = {f"{file_path}.{fmt}" for file_path, _, fmt in self._pending_dots}
+        try:
+            self.flush_renders()
+        except Exception as e:
+            for view, result in results.items():
+                if result.get('image_path') in pending_outputs:
+                    results[view] = {'success': False, 'error': f"Error al generar {view}: {str(e)}"}
+        
+        return {view: results[view] for view in views}
     
-    def create_petri_net(self, event_log):
-        """Crear visualización de Red de Petri"""
+    @_cached_output
+    def create_petri_net(self, event_log, high_res=False, lazy=False, return_bytes=False):
+        """Crear visualización de Red de Petri (high_res=True para exportar a EXPORT_DPI, lazy=True para diferir el render,
+        return_bytes=True para devolver la imagen en 'image_bytes' sin escribirla en disco)"""
         if not self.graphviz_available:
-            return self._create_alternative_visualization(event_log, "petri_net")
+            return self._create_alternative_visualization(event_log, "petri_net", high_res, return_bytes)
         
         try:
-            # Descubrir Red de Petri usando algoritmo inductive miner
-            petri_net, initial_marking, final_marking = pm4py.discover_petri_net_inductive(event_log)
+            # Descubrir Red de Petri usando algoritmo inductive miner (compartida con Process Tree y BPMN)
+            petri_net, initial_marking, final_marking = self._get_petri_from_tree(event_log)
             
             # Calcular métricas de fitness
-            try:
-                fitness = pm4py.fitness_token_based_replay(event_log, petri_net, initial_marking, final_marking)['log_fitness']
-                precision = pm4py.precision_token_based_replay(event_log, petri_net, initial_marking, final_marking)
-            except:
-                fitness = 0.0
-                precision = 0.0
+            fitness, precision = self._evaluate(event_log, petri_net, initial_marking, final_marking)
             
             # Generar visualización
-            filename = f"petri_net_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            file_path = os.path.join(self.temp_dir, f"{filename}.png")
+            filename = f"petri_net_{self._stamp()}"
+            file_path = self._output_path(f"{filename}.{self._view_format(high_res)}")
             
             # Visualizar y guardar
-            from pm4py.visualization.petri_net import visualizer as pn_visualizer
-            gviz = pn_visualizer.apply(petri_net, initial_marking, final_marking)
-            pn_visualizer.save(gviz, file_path)
+            def render(to_bytes=False):
+                gviz = pn_visualizer.apply(petri_net, initial_marking, final_marking)
+                self._set_dpi(gviz, high_res)
+                return self._save_gviz(gviz, file_path, pn_visualizer.save, to_bytes)
             
             return {
                 'success': True,
-                'image_path': file_path,
+                **self._image(render, lazy, return_bytes),
                 'metrics': {
-                    'Fitness': f"{fitness:.3f}",
-                    'Precision': f"{precision:.3f}",
+                    'Fitness': self._format_metric(fitness),
+                    'Precision': self._format_metric(precision),
                     'Places': len(petri_net.places),
                     'Transitions': len(petri_net.transitions)
                 },
@@ -70,38 +535,32 @@ class ProcessVisualizer:
                 'error': f"Error al crear Red de Petri: {str(e)}"
             }
     
-    def create_heuristic_net(self, event_log):
+    @_cached_output
+    def create_heuristic_net(self, event_log, high_res=False, lazy=False, return_bytes=False):
         """Crear visualización usando algoritmo heurístico"""
         try:
-            # Descubrir modelo usando heuristic miner
-            heuristic_net = pm4py.discover_heuristics_net(event_log)
-            
-            # Convertir a Petri net para evaluación
-            petri_net, initial_marking, final_marking = pm4py.convert_to_petri_net(heuristic_net)
+            # Descubrir modelo usando heuristic miner y convertir a Petri net para evaluación
+            heuristic_net, (petri_net, initial_marking, final_marking) = self._get_heuristic_net(event_log)
             
             # Calcular métricas
-            try:
-                fitness = pm4py.fitness_token_based_replay(event_log, petri_net, initial_marking, final_marking)['log_fitness']
-                precision = pm4py.precision_token_based_replay(event_log, petri_net, initial_marking, final_marking)
-            except:
-                fitness = 0.0
-                precision = 0.0
+            fitness, precision = self._evaluate(event_log, petri_net, initial_marking, final_marking)
             
             # Generar visualización
-            filename = f"heuristic_net_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            file_path = os.path.join(self.temp_dir, f"{filename}.png")
+            filename = f"heuristic_net_{self._stamp()}"
+            file_path = self._output_path(f"{filename}.{self._view_format(high_res)}")
             
             # Visualizar
-            from pm4py.visualization.heuristics_net import visualizer as hn_visualizer
-            gviz = hn_visualizer.apply(heuristic_net)
-            hn_visualizer.save(gviz, file_path)
+            def render(to_bytes=False):
+                gviz = hn_visualizer.apply(heuristic_net)
+                self._set_dpi(gviz, high_res)
+                return self._save_gviz(gviz, file_path, hn_visualizer.save, to_bytes)
             
             return {
                 'success': True,
-                'image_path': file_path,
+                **self._image(render, lazy, return_bytes),
                 'metrics': {
-                    'Fitness': f"{fitness:.3f}",
-                    'Precision': f"{precision:.3f}",
+                    'Fitness': self._format_metric(fitness),
+                    'Precision': self._format_metric(precision),
                     'Activities': len(heuristic_net.activities),
                     'Dependencies': len(heuristic_net.dependency_matrix)
                 },
@@ -114,120 +573,64 @@ class ProcessVisualizer:
                 'error': f"Error al crear red heurística: {str(e)}"
             }
     
-    def create_process_tree(self, event_log):
+    @_cached_output
+    def create_process_tree(self, event_log, high_res=False, lazy=False, return_bytes=False):
         """Crear visualización de Process Tree"""
         try:
             # Descubrir process tree
-            process_tree = pm4py.discover_process_tree_inductive(event_log)
+            process_tree = self._get_process_tree(event_log)
             
             # Convertir a Petri net para evaluación
-            petri_net, initial_marking, final_marking = pm4py.convert_to_petri_net(process_tree)
+            petri_net, initial_marking, final_marking = self._get_petri_from_tree(event_log)
             
             # Calcular métricas
-            try:
-                fitness = pm4py.fitness_token_based_replay(event_log, petri_net, initial_marking, final_marking)['log_fitness']
-                precision = pm4py.precision_token_based_replay(event_log, petri_net, initial_marking, final_marking)
-            except:
-                fitness = 0.0
-                precision = 0.0
+            fitness, precision = self._evaluate(event_log, petri_net, initial_marking, final_marking)
             
             # Generar visualización
-            filename = f"process_tree_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            file_path = os.path.join(self.temp_dir, f"{filename}.png")
+            stamp = self._stamp()
+            filename = f"process_tree_{stamp}"
+            file_path = self._output_path(f"{filename}.{self._view_format(high_res)}")
             
             # Crear visualización del process tree usando pm4py.view_process_tree
-            try:
-                # Usar la función específica recomendada
-                gviz = pm4py.view_process_tree(process_tree)
-                
-                # Guardar en archivo temporal
-                pm4py.save_vis_process_tree(gviz, file_path)
-                
-            except Exception as ex:
-                # Si falla, usar visualización personalizada con el estilo exacto de la imagen
-                dot = graphviz.Digraph(comment='Process Tree')
-                dot.attr(rankdir='TB', size='12,8', dpi='300', bgcolor='white')
-                dot.attr('node', fontname='Arial', fontsize='11', fontcolor='black')
-                dot.attr('edge', color='black', arrowhead='normal', arrowsize='0.8')
-                
-                # Función recursiva para construir el árbol con estilo exacto
-                def build_tree_visualization(tree, parent_id=None, dot=dot, node_counter=[0]):
-                    if tree is None:
-                        return None
-                    
-                    node_counter[0] += 1
-                    current_id = f"node_{node_counter[0]}"
+            tree_stats = []
+            def render(to_bytes=False):
+                try:
+                    # Usar la función específica recomendada
+                    gviz = pm4py.view_process_tree(process_tree)
+                    self._set_dpi(gviz, high_res)
                     
-                    # Determinar etiqueta y estilo del nodo (todos ovalados como en la imagen)
-                    if hasattr(tree, 'label') and tree.label:
-                        # Actividades - nodos ovalados
-                        label = str(tree.label)
-                        dot.node(current_id, label, shape='ellipse', 
-                                style='filled', fillcolor='white', 
-                                fontcolor='black', margin='0.1,0.05')
-                    elif hasattr(tree, 'operator'):
-                        # Operadores - nodos ovalados con nombres específicos
-                        operator = str(tree.operator)
-                        if operator == 'X' or operator == '×':
-                            label = 'xor'
-                        elif operator == '+':
-                            label = 'or'
-                        elif operator == '*':
-                            label = 'xor loop'
-                        elif operator == '→' or operator == 'SEQ':
-                            label = 'seq'
-                        elif operator == '∧' or operator == 'AND':
-                            label = 'and'
-                        else:
-                            label = str(operator).lower()
-                        
-                        dot.node(current_id, label, shape='ellipse', 
-                                style='filled', fillcolor='white',
-                                fontcolor='black', margin='0.1,0.05')
-                    else:
-                        # Nodos silenciosos
-                        dot.node(current_id, 'τ', shape='ellipse', 
-                                style='filled', fillcolor='white',
-                                fontcolor='black', margin='0.1,0.05')
+                    # Guardar en archivo temporal
+                    return self._save_gviz(gviz, file_path, pm4py.save_vis_process_tree, to_bytes)
                     
-                    if parent_id:
-                        dot.edge(parent_id, current_id)
+                except Exception as ex:
+                    # Si falla, usar visualización personalizada con el estilo exacto de la imagen
+                    # Construir visualización (contando nodos y profundidad en la misma pasada)
+                    lines = []
+                    tree_stats.append(self._walk_tree(process_tree, lines))
                     
-                    # Procesar hijos si existen
-                    if hasattr(tree, 'children') and tree.children:
-                        for child in tree.children:
-                            build_tree_visualization(child, current_id, dot, node_counter)
-                    
-                    return current_id
-                
-                # Construir visualización
-                build_tree_visualization(process_tree)
-                
-                # Renderizar con nombre temporal diferente
-                temp_filename = f"process_tree_custom_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                temp_path = os.path.join(self.temp_dir, temp_filename)
-                dot.render(temp_path, format='png', cleanup=True, quiet=True)
-                file_path = f"{temp_path}.png"
-                print(f"Custom process tree saved to {file_path}")
-            
-            # Contar nodos del árbol
-            def count_nodes(tree):
-                if tree is None:
-                    return 0
-                count = 1
-                if hasattr(tree, 'children'):
-                    for child in tree.children:
-                        count += count_nodes(child)
-                return count
+                    # Renderizar con nombre temporal diferente
+                    temp_filename = f"process_tree_custom_{stamp}"
+                    temp_path = self._output_path(temp_filename)
+                    fmt, graph_attrs = self._dot_format(high_res)
+                    custom = self._render_dot(_dot_source(_TREE_HEADER, graph_attrs + lines), temp_path, fmt=fmt,
+                                              to_bytes=to_bytes)
+                    if not to_bytes:
+                        print(f"Custom process tree saved to {custom}")
+                    return custom
+            
+            image = self._image(render, lazy, return_bytes)
+            
+            # Contar nodos y profundidad del árbol (ya contados si se dibujó la versión personalizada)
+            tree_nodes, tree_depth, _ = tree_stats[0] if tree_stats else self._walk_tree(process_tree)
             
             return {
                 'success': True,
-                'image_path': file_path,
+                **image,
                 'metrics': {
-                    'Fitness': f"{fitness:.3f}",
-                    'Precision': f"{precision:.3f}",
-                    'Tree_Nodes': count_nodes(process_tree),
-                    'Tree_Depth': self._calculate_tree_depth(process_tree)
+                    'Fitness': self._format_metric(fitness),
+                    'Precision': self._format_metric(precision),
+                    'Tree_Nodes': tree_nodes,
+                    'Tree_Depth': tree_depth
                 },
                 'model': process_tree
             }
@@ -238,41 +641,38 @@ class ProcessVisualizer:
                 'error': f"Error al crear Process Tree: {str(e)}"
             }
     
-    def create_bpmn(self, event_log):
+    @_cached_output
+    def create_bpmn(self, event_log, high_res=False, lazy=False, return_bytes=False):
         """Crear visualización BPMN"""
         try:
             # Descubrir process tree primero
-            process_tree = pm4py.discover_process_tree_inductive(event_log)
+            process_tree = self._get_process_tree(event_log)
             
             # Convertir a BPMN
             bpmn_diagram = pm4py.convert_to_bpmn(process_tree)
             
             # Convertir a Petri net para evaluación
-            petri_net, initial_marking, final_marking = pm4py.convert_to_petri_net(process_tree)
+            petri_net, initial_marking, final_marking = self._get_petri_from_tree(event_log)
             
             # Calcular métricas
-            try:
-                fitness = pm4py.fitness_token_based_replay(event_log, petri_net, initial_marking, final_marking)['log_fitness']
-                precision = pm4py.precision_token_based_replay(event_log, petri_net, initial_marking, final_marking)
-            except:
-                fitness = 0.0
-                precision = 0.0
+            fitness, precision = self._evaluate(event_log, petri_net, initial_marking, final_marking)
             
             # Generar visualización
-            filename = f"bpmn_diagram_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            file_path = os.path.join(self.temp_dir, f"{filename}.png")
+            filename = f"bpmn_diagram_{self._stamp()}"
+            file_path = self._output_path(f"{filename}.{self._view_format(high_res)}")
             
             # Visualizar
-            from pm4py.visualization.bpmn import visualizer as bpmn_visualizer
-            gviz = bpmn_visualizer.apply(bpmn_diagram)
-            bpmn_visualizer.save(gviz, file_path)
+            def render(to_bytes=False):
+                gviz = bpmn_visualizer.apply(bpmn_diagram)
+                self._set_dpi(gviz, high_res)
+                return self._save_gviz(gviz, file_path, bpmn_visualizer.save, to_bytes)
             
             return {
                 'success': True,
-                'image_path': file_path,
+                **self._image(render, lazy, return_bytes),
                 'metrics': {
-                    'Fitness': f"{fitness:.3f}",
-                    'Precision': f"{precision:.3f}",
+                    'Fitness': self._format_metric(fitness),
+                    'Precision': self._format_metric(precision),
                     'BPMN_Elements': len(bpmn_diagram.get_nodes()),
                     'BPMN_Flows': len(bpmn_diagram.get_flows())
                 },
@@ -285,95 +685,93 @@ class ProcessVisualizer:
                 'error': f"Error al crear diagrama BPMN: {str(e)}"
             }
     
-    def create_dfg(self, event_log):
-        """Crear visualización de Grafo Dirigido de Frecuencias (DFG)"""
+    @_cached_output
+    def create_dfg(self, event_log, high_res=False, lazy=False, max_edges=DFG_MAX_EDGES, return_bytes=False):
+        """Crear visualización de Grafo Dirigido de Frecuencias (DFG), dibujando solo los max_edges arcos más frecuentes"""
         try:
             # Descubrir DFG usando pm4py
             dfg, start_activities, end_activities = pm4py.discover_dfg(event_log)
             
+            # Log sin eventos: no hay grafo que dibujar
+            if not dfg and not start_activities:
+                return self._empty_dfg_result()
+            
             # Crear archivo temporal
-            filename = f"dfg_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            file_path = os.path.join(self.temp_dir, filename)
-            
-            # Crear visualización DFG con fondo blanco
-            dot = graphviz.Digraph(comment='DFG')
-            dot.attr(bgcolor='white', size='12,8', dpi='300')
-            dot.attr('node', fontname='Arial', fontsize='10', fontcolor='black')
-            dot.attr('edge', color='black', arrowhead='normal', arrowsize='0.8')
-            
-            # Agregar nodo de inicio (círculo verde)
-            dot.node('START', '', shape='circle', style='filled', 
-                    fillcolor='#00FF00', width='0.8', height='0.8', fixedsize='true')
-            
-            # Agregar nodo de fin (círculo naranja)
-            dot.node('END', '', shape='circle', style='filled', 
-                    fillcolor='#FFA500', width='0.8', height='0.8', fixedsize='true')
-            
-            # Agregar todas las actividades del DFG como nodos rectangulares blancos
-            activities = set()
-            if dfg:
-                for (source, target), frequency in dfg.items():
-                    activities.add(source)
-                    activities.add(target)
-            
-            for activity in activities:
-                # Agregar frecuencia de la actividad si existe
-                freq_text = ""
-                if start_activities and activity in start_activities:
-                    freq_text = f" ({start_activities[activity]})"
-                elif end_activities and activity in end_activities:
-                    freq_text = f" ({end_activities[activity]})"
-                
-                dot.node(activity, f"{activity}{freq_text}", 
-                        shape='rectangle', style='filled', fillcolor='white',
-                        fontcolor='black', margin='0.1,0.05')
-            
-            # Conectar START con actividades iniciales
-            if start_activities:
-                for activity in start_activities.keys():
-                    dot.edge('START', activity, color='black')
-            
-            # Agregar arcos del DFG entre actividades
-            if dfg:
-                for (source, target), frequency in dfg.items():
-                    dot.edge(source, target, color='black')
-            
-            # Conectar actividades finales con END
-            if end_activities:
-                for activity in end_activities.keys():
-                    dot.edge(activity, 'END', color='black')
-            
-            # Renderizar el grafo
-            dot.render(file_path, format='png', cleanup=True)
-            final_path = f"{file_path}.png"
-            
-            # Calcular estadísticas del DFG
-            total_edges = len(dfg) if dfg else 0
-            total_frequency = sum(dfg.values()) if dfg else 0
-            most_frequent_edge = max(dfg.items(), key=lambda x: x[1]) if dfg else None
+            filename = f"dfg_{self._stamp()}"
+            file_path = self._output_path(filename)
+            
+            # Podar a los arcos más frecuentes: el layout de dot no escala con miles de arcos
+            if max_edges and len(dfg) > max_edges:
+                shown_edges = heapq.nlargest(max_edges, dfg.items(), key=lambda item: item[1])
+            else:
+                shown_edges = dfg.items()
+            
+            # Actividades dibujadas: las de los arcos mostrados y las de inicio/fin
+            starts = start_activities
+            ends = end_activities
+            activities = {activity for pair, _ in shown_edges for activity in pair}
+            activities.update(starts, ends)
+            
+            # En DFGs grandes usar sfdp (force-directed multinivel)
+            # en lugar del layout jerárquico de dot
+            engine = 'sfdp' if len(activities) > DFG_SFDP_THRESHOLD else 'dot'
+            # Frecuencia de cada actividad (de inicio o, si no, de fin) precalculada
+            freq_map = {a: f" ({starts[a]})" if a in starts else f" ({ends[a]})" if a in ends else "" for a in activities}
+            
+            # Nombres escapados una sola vez por actividad y reutilizados en nodos y arcos
+            names = {activity: _escape(activity) for activity in activities}
+            
+            # Actividades como nodos rectangulares blancos, con su frecuencia si existe
+            node_lines = [f'"{name}" [label="{name}{freq_map[activity]}" fillcolor=white fontcolor=black '
+                          f'margin="0.1,0.05" shape=rectangle style=filled]' for activity, name in names.items()]
+            
+            # START con actividades iniciales, arcos del DFG y actividades finales con END
+            start_edges = [f'START -> "{names[activity]}"' for activity in starts]
+            # En la misma pasada sobre los arcos mostrados: arco más frecuente
+            edge_lines = []
+            most_frequent_edge = None
+            most_frequent_count = -1
+            for (source, target), frequency in shown_edges:
+                edge_lines.append(f'"{names[source]}" -> "{names[target]}"')
+                if frequency > most_frequent_count:
+                    most_frequent_edge = (source, target)
+                    most_frequent_count = frequency
+            end_edges = [f'"{names[activity]}" -> END' for activity in ends]
+            
+            # Generar el código DOT de una sola vez y renderizar el grafo
+            fmt, graph_attrs = self._dot_format(high_res)
+            src = _dot_source(_DFG_HEADER, graph_attrs + node_lines + start_edges + edge_lines + end_edges)
+            image = self._image(lambda to_bytes=False: self._render_dot(src, file_path, engine=engine, fmt=fmt,
+                                                                        to_bytes=to_bytes),
+                                lazy, return_bytes)
+            
+            # Calcular estadísticas del DFG completo (no solo de lo dibujado)
+            total_edges = len(dfg)
+            total_frequency = sum(dfg.values())
             
             # Preparar métricas
             metrics = {
                 "Total de Arcos": total_edges,
+                "Arcos Mostrados": len(edge_lines),
                 "Frecuencia Total": int(total_frequency),
-                "Actividades de Inicio": len(start_activities) if start_activities else 0,
-                "Actividades de Fin": len(end_activities) if end_activities else 0,
-                "Actividades Únicas": len(activities)
+                "Actividades de Inicio": len(starts),
+                "Actividades de Fin": len(ends),
+                "Actividades Únicas": len({activity for pair in dfg for activity in pair})
             }
             
             if most_frequent_edge:
-                edge_from, edge_to = most_frequent_edge[0]
-                frequency = most_frequent_edge[1]
-                metrics["Arco Más Frecuente"] = f"{edge_from} → {edge_to} ({frequency})"
+                edge_from, edge_to = most_frequent_edge
+                metrics["Arco Más Frecuente"] = f"{edge_from} → {edge_to} ({most_frequent_count})"
             
             return {
                 'success': True,
-                'image_path': final_path,
+                **image,
                 'metrics': metrics,
                 'dfg_data': {
-                    'dfg': dict(dfg) if dfg else {},
-                    'start_activities': dict(start_activities) if start_activities else {},
-                    'end_activities': dict(end_activities) if end_activities else {},
+                    # pm4py ya devuelve diccionarios: copiar solo si no lo son
+                    'dfg': dfg if isinstance(dfg, dict) else dict(dfg),
+                    'start_activities': starts if isinstance(starts, dict) else dict(starts),
+                    'end_activities': ends if isinstance(ends, dict) else dict(ends),
                     'total_edges': total_edges,
                     'total_frequency': int(total_frequency)
                 }
@@ -385,33 +783,52 @@ class ProcessVisualizer:
                 'error': f"Error al crear DFG: {str(e)}"
             }
     
+    def _empty_dfg_result(self):
+        """Resultado de create_dfg para un log sin eventos (sin imagen)"""
+        return {
+            'success': True,
+            'metrics': {
+                "Total de Arcos": 0,
+                "Arcos Mostrados": 0,
+                "Frecuencia Total": 0,
+                "Actividades de Inicio": 0,
+                "Actividades de Fin": 0,
+                "Actividades Únicas": 0
+            },
+            'dfg_data': {
+                'dfg': _EMPTY,
+                'start_activities': _EMPTY,
+                'end_activities': _EMPTY,
+                'total_edges': 0,
+                'total_frequency': 0
+            }
+        }
+    
     def create_custom_graph(self, data, title="Process Graph"):
         """Crear gráfico personalizado usando Graphviz"""
         try:
-            dot = graphviz.Digraph(comment=title)
-            dot.attr(rankdir='LR', size='12,8', dpi='300')
-            dot.attr('node', shape='rectangle', style='rounded,filled', fillcolor='lightblue')
-            dot.attr('edge', color='gray', fontsize='10')
-            
             # Agregar nodos y edges según los datos
+            lines = []
             if 'nodes' in data:
                 for node in data['nodes']:
-                    dot.node(node['id'], node['label'])
+                    lines.append(f'"{_escape(node["id"])}" [label="{_label(node["label"])}"]')
             
             if 'edges' in data:
                 for edge in data['edges']:
-                    dot.edge(edge['from'], edge['to'], label=edge.get('label', ''))
+                    lines.append(f'"{_escape(edge["from"])}" -> "{_escape(edge["to"])}" [label="{_label(edge.get("label", ""))}"]')
+            
+            src = _dot_source(_CUSTOM_HEADER, lines)
             
             # Generar imagen
-            filename = f"custom_graph_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            file_path = os.path.join(self.temp_dir, filename)
+            filename = f"custom_graph_{self._stamp()}"
+            file_path = self._output_path(filename)
             
-            dot.render(file_path, format='png', cleanup=True)
+            image_path = self._render_dot(src, file_path)
             
             return {
                 'success': True,
-                'image_path': f"{file_path}.png",
-                'dot_source': dot.source
+                'image_path': image_path,
+                'dot_source': src
             }
             
         except Exception as e:
@@ -420,28 +837,146 @@ class ProcessVisualizer:
                 'error': f"Error al crear gráfico personalizado: {str(e)}"
             }
     
-    def _calculate_tree_depth(self, tree, depth=0):
-        """Calcular la profundidad de un process tree"""
-        if tree is None:
-            return depth
+    def _image(self, render, lazy=False, return_bytes=False):
+        """Renderizar ya ('image_path'), a memoria ('image_bytes') o diferir el render a un LazyImage ('image')"""
+        if return_bytes:
+            return {'image_bytes': render(to_bytes=True)}
+        if lazy:
+            return {'image': LazyImage(render)}
+        return {'image_path': render()}
+    
+    def _view_format(self, high_res=False):
+        """Formato de salida de una vista de pm4py: PNG para exportar en alta resolución, si no output_format"""
+        return 'png' if high_res else self.output_format
+    
+    def _save_gviz(self, gviz, file_path, save, to_bytes=False):
+        """Guardar un grafo de pm4py con su función save, o devolver un PNG en bytes con pipe() sin tocar el disco"""
+        if to_bytes:
+            # st.image solo muestra bitmaps a partir de bytes: siempre PNG
+            gviz.graph_attr.setdefault('dpi', str(self.dpi))
+            return gviz.pipe(format='png')
+        # El save de pm4py renderiza en gviz.format: fijarlo según la extensión del archivo
+        fmt = os.path.splitext(file_path)[1][1:]
+        gviz.format = fmt
+        save(gviz, file_path)
+        return file_path
+    
+    def _set_dpi(self, gviz, high_res=False):
+        """Fijar la resolución de rasterizado de un grafo de pm4py (en SVG el dpi solo escalaría el dibujo)"""
+        if hasattr(gviz, 'graph_attr') and self._view_format(high_res) != 'svg':
+            gviz.graph_attr['dpi'] = str(EXPORT_DPI if high_res else self.dpi)
+    
+    def _dot_format(self, high_res=False):
+        """Formato y atributos de grafo de un DOT propio: PNG a EXPORT_DPI para exportar, si no SVG"""
+        if high_res:
+            return 'png', [f'dpi={EXPORT_DPI}']
+        return 'svg', []
+    
+    def _render_dot(self, source, file_path, engine='dot', fmt='svg', to_bytes=False):
+        """Renderizar código DOT: en proceso con pygraphviz si está instalado, en lote o por stdin
+        (to_bytes=True devuelve un PNG en bytes en lugar de la ruta)"""
+        if to_bytes:
+            # st.image solo muestra bitmaps a partir de bytes: PNG a self.dpi salvo que el DOT fije su dpi
+            if PYGRAPHVIZ_AVAILABLE:
+                return pygraphviz.AGraph(string=source).draw(format='png', prog=engine, args=f'-Gdpi={self.dpi}')
+            return self._render_stream(source, None, engine, 'png', dpi=self.dpi)
         
-        max_child_depth = depth
-        if hasattr(tree, 'children'):
-            for child in tree.children:
-                child_depth = self._calculate_tree_depth(child, depth + 1)
-                max_child_depth = max(max_child_depth, child_depth)
+        output_path = f"{file_path}.{fmt}"
+        if PYGRAPHVIZ_AVAILABLE:
+            # libgvc enlazada en el propio proceso: sin lanzar un subproceso dot por render
+            graph = pygraphviz.AGraph(string=source)
+            graph.draw(output_path, format=fmt, prog=engine)
+        elif self.batch_renders:
+            # Guardar solo el código DOT; flush_renders lo renderiza junto con el resto
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(source)
+            self._pending_dots.append((file_path, engine, fmt))
+        else:
+            self._render_stream(source, output_path, engine, fmt)
+        return output_path
+    
+    def _render_stream(self, source, output_path, engine='dot', fmt='svg', dpi=None):
+        """Enviar el código DOT a dot por stdin, sin escribir el .dot en disco (sin output_path, devolver la salida en bytes)"""
+        command = ['dot', f'-K{engine}', f'-T{fmt}']
+        if dpi is not None:
+            # Valor por defecto: un dpi fijado en el propio DOT tiene prioridad
+            command.append(f'-Gdpi={dpi}')
+        if output_path is not None:
+            command += ['-o', output_path]
+        process = subprocess.run(command, input=source.encode('utf-8'), capture_output=True)
+        if process.returncode != 0:
+            raise Exception(f"dot terminó con código {process.returncode}: {process.stderr.decode('utf-8', errors='ignore').strip()}")
+        return process.stdout if output_path is None else output_path
+    
+    def flush_renders(self):
+        """Renderizar los DOT pendientes con una sola invocación de dot por motor y formato"""
+        pending, self._pending_dots = self._pending_dots, []
+        groups = {}
+        for file_path, engine, fmt in pending:
+            groups.setdefault((engine, fmt), []).append(file_path)
         
-        return max_child_depth
+        try:
+            for (engine, fmt), paths in groups.items():
+                # -O escribe cada salida junto a su fuente como <fuente>.<formato>
+                subprocess.run(['dot', f'-K{engine}', f'-T{fmt}', '-O', *paths],
+                               check=True, capture_output=True)
+        finally:
+            for file_path, _, _ in pending:
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+    
+    def _walk_tree(self, root, lines=None):
+        """Recorrer el process tree una sola vez: contar nodos, profundidad y (opcional) emitir sus líneas DOT"""
+        count = 0
+        max_depth = 0
+        root_id = None
+        stack = [(root, None, 0)]
+        
+        while stack:
+            tree, parent_id, depth = stack.pop()
+            if tree is None:
+                continue
+            count += 1
+            max_depth = max(max_depth, depth)
+            current_id = f"node_{count}"
+            if root_id is None:
+                root_id = current_id
+            
+            label = getattr(tree, 'label', None)
+            operator = getattr(tree, 'operator', None)
+            children = getattr(tree, 'children', None)
+            
+            if lines is not None:
+                # Determinar etiqueta del nodo (todos ovalados, estilo en _TREE_HEADER)
+                if label:
+                    # Actividades: nombre literal, sin secuencias de escape de DOT
+                    label = _escape(label)
+                elif operator is not None:
+                    # Operadores con nombres específicos
+                    label = _OP_LABELS.get(operator) or _OP_LABELS.get(str(operator), str(operator).lower())
+                else:
+                    # Nodos silenciosos
+                    label = 'τ'
+                
+                lines.append(f'{current_id} [label="{label}"]')
+                
+                if parent_id:
+                    lines.append(f'{parent_id} -> {current_id}')
+            
+            # Apilar hijos en orden inverso para mantener el orden original
+            if children:
+                for child in reversed(children):
+                    stack.append((child, current_id, depth + 1))
+        
+        return count, max_depth, root_id
     
     def generate_summary_visualization(self, analysis_results):
         """Generar visualización resumen de todos los análisis"""
         try:
-            dot = graphviz.Digraph(comment='Process Analysis Summary')
-            dot.attr(rankdir='TB', size='16,12', dpi='300')
-            dot.attr('node', shape='rectangle', style='rounded,filled')
-            
             # Nodo principal
-            dot.node('summary', 'Resumen del Proceso', fillcolor='lightgreen', fontsize='16')
+            lines = ['summary [label="Resumen del Proceso" fillcolor=lightgreen fontsize=16]']
             
             # Agregar métricas si están disponibles
             if 'process' in analysis_results:
@@ -451,8 +986,8 @@ class ProcessVisualizer:
                 metrics_text += f"Actividades: {process_data.get('num_activities', 'N/A')}\\n"
                 metrics_text += f"Duración Promedio: {process_data.get('avg_case_duration', 'N/A'):.2f} días"
                 
-                dot.node('metrics', metrics_text, fillcolor='lightblue')
-                dot.edge('summary', 'metrics', label='Métricas Básicas')
+                lines.append(f'metrics [label="{_label(metrics_text)}" fillcolor=lightblue]')
+                lines.append('summary -> metrics [label="Métricas Básicas"]')
             
             # Agregar información de variantes
             if 'variants' in analysis_results:
@@ -460,19 +995,21 @@ class ProcessVisualizer:
                 variants_text = f"Total Variantes: {variants_data.get('num_variants', 'N/A')}\\n"
                 variants_text += f"Variantes Únicas: {variants_data.get('unique_variants_count', 'N/A')}"
                 
-                dot.node('variants', variants_text, fillcolor='lightyellow')
-                dot.edge('summary', 'variants', label='Variantes')
+                lines.append(f'variants [label="{_label(variants_text)}" fillcolor=lightyellow]')
+                lines.append('summary -> variants [label="Variantes"]')
+            
+            src = _dot_source(_SUMMARY_HEADER, lines)
             
             # Generar imagen
-            filename = f"summary_viz_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            file_path = os.path.join(self.temp_dir, filename)
+            filename = f"summary_viz_{self._stamp()}"
+            file_path = self._output_path(filename)
             
-            dot.render(file_path, format='png', cleanup=True)
+            image_path = self._render_dot(src, file_path)
             
             return {
                 'success': True,
-                'image_path': f"{file_path}.png",
-                'dot_source': dot.source
+                'image_path': image_path,
+                'dot_source': src
             }
             
         except Exception as e:
@@ -480,53 +1017,51 @@ class ProcessVisualizer:
                 'success': False,
                 'error': f"Error al crear visualización resumen: {str(e)}"
             }
-    def _create_alternative_visualization(self, event_log, viz_type):
+    def _create_alternative_visualization(self, event_log, viz_type, high_res=False, return_bytes=False):
         """Crear visualización alternativa cuando Graphviz no está disponible"""
         try:
             import matplotlib.pyplot as plt
-            import pandas as pd
             import networkx as nx
-            from collections import defaultdict
-            
-            # Convertir event log a DataFrame si es necesario
-            if hasattr(event_log, 'to_dict'):
-                df = pd.DataFrame(event_log.to_dict())
-            else:
-                df = event_log
+            import numpy as np
+            
+            # Convertir event log a DataFrame si es necesario, proyectado a las columnas necesarias
+            if not isinstance(event_log, pd.DataFrame):
+                event_log = pm4py.convert_to_dataframe(event_log)
+            df = event_log[['case:concept:name', 'concept:name', 'time:timestamp']].sort_values(
+                ['case:concept:name', 'time:timestamp'], kind='stable')
+            
+            # Transiciones: cada actividad con la siguiente de su mismo caso. Con el log ordenado
+            # los casos son tramos contiguos, así que basta comparar cada fila con la siguiente
+            cases = df['case:concept:name']
+            activities = df['concept:name']
+            same_case = (cases == cases.shift(-1)).to_numpy()
+            transitions = pd.DataFrame({'from': activities[same_case].array,
+                                        'to': activities.shift(-1)[same_case].array}).dropna()
+            transitions = transitions.groupby(['from', 'to'], sort=False, observed=True).size()
             
             # Crear grafo de flujo de proceso
             G = nx.DiGraph()
-            transitions = defaultdict(int)
-            
-            # Agrupar por caso y crear secuencias
-            for case_id in df['case:concept:name'].unique():
-                case_events = df[df['case:concept:name'] == case_id].sort_values('time:timestamp')
-                activities = case_events['concept:name'].tolist()
-                
-                # Agregar transiciones
-                for i in range(len(activities) - 1):
-                    from_activity = activities[i]
-                    to_activity = activities[i + 1]
-                    transitions[(from_activity, to_activity)] += 1
-                    G.add_edge(from_activity, to_activity, weight=transitions[(from_activity, to_activity)])
+            G.add_weighted_edges_from((source, target, int(count)) for (source, target), count in transitions.items())
             
             # Crear visualización con matplotlib
             plt.figure(figsize=(12, 8))
             plt.title(f'Flujo de Proceso - {viz_type.replace("_", " ").title()}')
             
-            # Layout del grafo
-            pos = nx.spring_layout(G, k=2, iterations=50)
+            # Layout del grafo: spring_layout es O(V²) por iteración, circular en grafos grandes
+            if len(G) > ALT_CIRCULAR_THRESHOLD:
+                pos = nx.circular_layout(G)
+            else:
+                pos = nx.spring_layout(G, k=2, iterations=20, seed=42)
             
             # Dibujar nodos
             nx.draw_networkx_nodes(G, pos, node_color='lightblue', 
                                  node_size=3000, alpha=0.7)
             
             # Dibujar aristas con grosor proporcional al peso
-            edges = G.edges()
-            weights = [G[u][v]['weight'] for u, v in edges]
-            max_weight = max(weights) if weights else 1
+            weights = np.fromiter((w for _, _, w in G.edges(data='weight')), dtype=np.float32, count=G.number_of_edges())
+            widths = weights * (5.0 / weights.max()) if len(weights) else weights
             
-            nx.draw_networkx_edges(G, pos, width=[w/max_weight * 5 for w in weights],
+            nx.draw_networkx_edges(G, pos, width=widths,
                                  alpha=0.6, edge_color='gray', arrows=True,
                                  arrowsize=20, arrowstyle='->')
             
@@ -534,16 +1069,23 @@ class ProcessVisualizer:
             nx.draw_networkx_labels(G, pos, font_size=8, font_weight='bold')
             
             # Agregar etiquetas de peso en las aristas
-            edge_labels = {(u, v): str(G[u][v]['weight']) for u, v in G.edges()}
+            edge_labels = {(u, v): str(w) for u, v, w in G.edges(data='weight')}
             nx.draw_networkx_edge_labels(G, pos, edge_labels, font_size=6)
             
             plt.axis('off')
             plt.tight_layout()
             
-            # Guardar imagen
-            filename = f"{viz_type}_alternative_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            file_path = os.path.join(self.temp_dir, filename)
-            plt.savefig(file_path, dpi=300, bbox_inches='tight')
+            # Guardar imagen (o escribirla en memoria con return_bytes)
+            dpi = EXPORT_DPI if high_res else self.dpi
+            if return_bytes:
+                buffer = io.BytesIO()
+                plt.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+                image = {'image_bytes': buffer.getvalue()}
+            else:
+                filename = f"{viz_type}_alternative_{self._stamp()}.png"
+                file_path = self._output_path(filename)
+                plt.savefig(file_path, dpi=dpi, bbox_inches='tight')
+                image = {'image_path': file_path}
             plt.close()
             
             # Calcular métricas básicas
@@ -552,7 +1094,7 @@ class ProcessVisualizer:
             
             return {
                 'success': True,
-                'image_path': file_path,
+                **image,
                 'metrics': {
                     'Actividades': num_activities,
                     'Transiciones': num_transitions,